@@ -1,3 +1,4 @@
+import time
 import numpy                as np
 import  MetaTrader5         as mt5
 import matplotlib.pyplot    as plt
@@ -7,38 +8,55 @@ from sklearn.metrics        import mean_squared_error, mean_absolute_error, r2_s
 from keras.models           import Sequential
 from keras.layers           import LSTM, Dense, Dropout
 
-# ===================================================
-# LSTMモデルの学習・予測
-# - 入力: 特徴量付きDataFrame（df）
-# - 出力: 翌日の終値予測値（1ステップ）と更新済みdf
-# ===================================================
-def LSTMModel_PredictLSTM(df, timeFrame = mt5.TIMEFRAME_D1, show_plot = False):
-    print("[INFO] LSTM Phase開始")
+from Framework.Utility.Metrics  import LSTM_TRAIN_SECONDS, LSTM_INFER_SECONDS
 
+# モデル構成を変えたら更新する（実行履歴に記録される）
+LSTM_MODEL_VERSION = "lstm64-lstm32-dense5-e30-v3"
+
+# 評価・残差用に学習から外す末尾シーケンスの割合（アウトオブサンプル）
+_HOLDOUT_RATIO  = 0.2
+# ホールドアウト評価後、直近データを取り込むための全データでの追加学習エポック数
+_REFIT_EPOCHS   = 5
+
+FEATURES = [
+    "close", "volume", "SMA_20", "SMA_50", "RSI_14",
+    "MACD", "MACD_signal", "MACD_diff",
+    "Support", "Resistance", "ATR_14",
+    "ADX_14", "+DI", "-DI", "PSAR"
+]
+
+# ---------------------------------------------------
+# 時間足別のシーケンス長・予測ステップ数
+# ---------------------------------------------------
+def LSTMModel_SequenceParams(timeFrame):
     # LONG(日足)バージョン
     if timeFrame == mt5.TIMEFRAME_D1:
-        _sequence_length    = 120
-        _prediction_steps   = 5  # ← 5日後まで
+        return 120, 5  # ← 5日後まで
     # SHORT(15分足)バージョン
-    else:
-        _sequence_length    = 48
-        _prediction_steps   = 5  # ← 5日後まで
+    return 48, 5
+
+# ===================================================
+# LSTMモデルの学習
+# - 入力: 特徴量付きDataFrame（df）
+# - 出力: 学習済み一式（model・スケーラ・スケーリング済み特徴量・シーケンス長）
+#   ※ LSTMStream（逐次推論）はこの一式から状態保持モデルを組み立てる
+# ===================================================
+def LSTMModel_Train(df, timeFrame = mt5.TIMEFRAME_D1, show_plot = False):
+    print("[INFO] LSTM Phase開始")
 
-    FEATURES = [
-        "close", "volume", "SMA_20", "SMA_50", "RSI_14",
-        "MACD", "MACD_signal", "MACD_diff",
-        "Support", "Resistance", "ATR_14",
-        "ADX_14", "+DI", "-DI", "PSAR"
-    ]
+    _sequence_length, _prediction_steps = LSTMModel_SequenceParams(timeFrame)
 
     df_feat = df[FEATURES].copy().dropna()
-    df_target = df["close"].copy()
+    # ターゲットは特徴量と同じ行（dropna後）に揃える
+    # （揃えないと先頭の欠損行の本数だけ正解ラベルがずれる）
+    df_target = df.loc[df_feat.index, "close"].copy()
 
     # 特徴量とターゲットをスケーリング
     feature_scaler = MinMaxScaler()
     target_scaler = MinMaxScaler()
 
-    X_scaled = feature_scaler.fit_transform(df_feat)
+    # 列名なしで学習（LSTMStream が1行ずつ ndarray で transform するため）
+    X_scaled = feature_scaler.fit_transform(df_feat.to_numpy())
     y_scaled = target_scaler.fit_transform(df_target.values.reshape(-1, 1))
 
     # シーケンスとターゲットを構築（マルチステップ）
@@ -59,21 +77,46 @@ def LSTMModel_PredictLSTM(df, timeFrame = mt5.TIMEFRAME_D1, show_plot = False):
     model.add(Dense(_prediction_steps))  # 出力5個
 
     model.compile(optimizer='adam', loss='mean_squared_error')
-    model.fit(X, y, epochs=30, batch_size=32, verbose=0)
 
-    y_pred_scaled = model.predict(X)
-    y_true = target_scaler.inverse_transform(y)
+    # 末尾をホールドアウトとして学習から外す
+    # - 学習側の最後の正解ラベル（prediction_steps本先まで）がホールドアウト期間に
+    #   かからないよう、境界に prediction_steps 本の空きを設ける
+    n_holdout = max(int(len(X) * _HOLDOUT_RATIO), 1)
+    n_fit = len(X) - n_holdout - _prediction_steps
+    if n_fit <= 0:
+        raise ValueError(f"LSTM学習データ不足: シーケンス数={len(X)}")
+    X_hold, y_hold = X[-n_holdout:], y[-n_holdout:]
+
+    start = time.perf_counter()
+    model.fit(X[:n_fit], y[:n_fit], epochs=30, batch_size=32, verbose=0)
+    LSTM_TRAIN_SECONDS.observe(time.perf_counter() - start)
+
+    y_pred_scaled = model.predict(X_hold)
+    y_true = target_scaler.inverse_transform(y_hold)
     y_pred = target_scaler.inverse_transform(y_pred_scaled)
 
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     mae = mean_absolute_error(y_true, y_pred)
     r2 = r2_score(y_true, y_pred)
 
-    print("[Model Evaluation]")
+    print(f"[Model Evaluation] ホールドアウト {n_holdout}件（学習 {n_fit}件）")
     print(f"RMSE: {rmse:.4f}")
     print(f"MAE:  {mae:.4f}")
     print(f"R^2:  {r2:.4f}")
 
+    # ホールドアウトのみの値を保存（RiskEngineのリサンプリング元）
+    # - LSTM_Residuals      : 相対残差（実績 - 予測）/ 予測（ホライズン別）
+    # - LSTM_HoldoutReturns : 基準足の終値からの実績リターン（ホライズン別）
+    # シーケンスkの基準足（ウィンドウ最終行）は sequence_length - 1 + k 行目
+    base_close = df_target.to_numpy(dtype=np.float64)[_sequence_length - 1:_sequence_length - 1 + len(X)][-n_holdout:]
+    df.attrs["LSTM_Residuals"] = (y_true - y_pred) / y_pred
+    df.attrs["LSTM_HoldoutReturns"] = (y_true - base_close[:, np.newaxis]) / base_close[:, np.newaxis]
+
+    # 直近の値動きを予測に反映させるため、ホールドアウト込みの全データで追加学習
+    start = time.perf_counter()
+    model.fit(X, y, epochs=_REFIT_EPOCHS, batch_size=32, verbose=0)
+    LSTM_TRAIN_SECONDS.observe(time.perf_counter() - start)
+
     # オプションでカーブ表示
     if show_plot:
         plt.figure(figsize=(12, 5))
@@ -85,12 +128,38 @@ def LSTMModel_PredictLSTM(df, timeFrame = mt5.TIMEFRAME_D1, show_plot = False):
         plt.tight_layout()
         plt.show()
 
+    return {
+        "model"             : model,
+        "feature_scaler"    : feature_scaler,
+        "target_scaler"     : target_scaler,
+        "X_scaled"          : X_scaled,
+        "sequence_length"   : _sequence_length,
+        "prediction_steps"  : _prediction_steps,
+    }
+
+# ===================================================
+# 学習済み一式で最新シーケンスから未来5本を予測
+# ===================================================
+def LSTMModel_Forecast(bundle):
+    _sequence_length = bundle["sequence_length"]
+
     # 最新シーケンスから未来5日間を予測
-    latest_sequence = X_scaled[-_sequence_length:]
+    latest_sequence = bundle["X_scaled"][-_sequence_length:]
     latest_sequence = np.expand_dims(latest_sequence, axis=0)
-    future_pred_scaled = model.predict(latest_sequence)[0]
-    future_pred = target_scaler.inverse_transform(future_pred_scaled.reshape(-1, 1)).flatten()
+    start = time.perf_counter()
+    future_pred_scaled = bundle["model"].predict(latest_sequence)[0]
+    LSTM_INFER_SECONDS.observe(time.perf_counter() - start)
+    future_pred = bundle["target_scaler"].inverse_transform(future_pred_scaled.reshape(-1, 1)).flatten()
 
     print("[予測] 5日先までの終値:", [f"{p:.2f}" for p in future_pred])
 
-    return future_pred.tolist(), df
+    return future_pred.tolist()
+
+# ===================================================
+# LSTMモデルの学習・予測
+# - 入力: 特徴量付きDataFrame（df）
+# - 出力: 翌日の終値予測値（1ステップ）と更新済みdf
+# ===================================================
+def LSTMModel_PredictLSTM(df, timeFrame = mt5.TIMEFRAME_D1, show_plot = False):
+    bundle = LSTMModel_Train(df, timeFrame, show_plot)
+    return LSTMModel_Forecast(bundle), df
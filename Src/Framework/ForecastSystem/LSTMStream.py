@@ -0,0 +1,144 @@
+# ===================================================
+# LSTMStream.py
+# - 学習済みLSTM（LSTMModel_Train の一式）の重みを状態保持（stateful）モデルに移し、
+#   新しい足が1本確定するたびに1タイムステップだけ進めて予測する
+# - LSTM層の隠れ状態・セル状態は足をまたいで保持し、resync_every 本ごとに
+#   直近ウィンドウ全体から状態を作り直してずれ（ドリフト）を抑える
+# - バッチ次元 = 銘柄。複数銘柄を1回の推論でまとめて進める（スケーラは銘柄別）
+# ===================================================
+
+import time
+import numpy                as np
+
+from keras                  import backend
+from keras.models           import Sequential
+from keras.layers           import Input, LSTM, Dense, Dropout
+
+from Framework.ForecastSystem.LSTMModel import FEATURES
+from Framework.Utility.Metrics          import LSTM_STREAM_SECONDS
+
+# 状態保持を検証済みのバックエンド
+# - JAX バックエンドでは predict_on_batch の間でLSTMの状態が引き継がれず、
+#   step() がゼロ状態からの1ステップ予測になる（エラーにならない）ため対象外
+_SUPPORTED_BACKENDS = ("tensorflow",)
+
+# ===================================================
+# 逐次推論が使えるか（Kerasのバックエンドで判定）
+# ===================================================
+def LSTMStream_Supported():
+    return backend.backend() in _SUPPORTED_BACKENDS
+
+# ---------------------------------------------------
+# 学習済みモデルと同じ構成の stateful モデルを組み立てて重みをコピー
+# - Dropout は推論時は恒等なので省く（重みを持たないため get_weights の並びは一致）
+# ---------------------------------------------------
+def _BuildStatefulModel(model, batch_size, n_features):
+    stream = Sequential()
+    stream.add(Input(batch_shape=(batch_size, None, n_features)))
+    for layer in model.layers:
+        if isinstance(layer, LSTM):
+            stream.add(LSTM(units=layer.units, return_sequences=layer.return_sequences, stateful=True))
+        elif isinstance(layer, Dense):
+            stream.add(Dense(layer.units))
+        elif not isinstance(layer, Dropout):
+            raise ValueError(f"LSTMStream: 未対応のレイヤー {type(layer).__name__}")
+    stream.set_weights(model.get_weights())
+    return stream
+
+def _ResetStates(model):
+    for layer in model.layers:
+        if isinstance(layer, LSTM):
+            # Keras 3 は reset_state、Keras 2 は reset_states
+            (getattr(layer, "reset_state", None) or layer.reset_states)()
+
+class LSTMStreamer:
+    """
+    状態保持型のLSTM逐次推論
+    - model        : LSTMModel_Train で学習したモデル（重みは全銘柄で共有）
+    - scalers      : 銘柄ごとの (feature_scaler, target_scaler) のリスト
+    - resync_every : この本数ごとに直近 sequence_length 本から状態を作り直す（既定: sequence_length）
+    """
+    def __init__(self, model, scalers, sequence_length, resync_every=None):
+        if not LSTMStream_Supported():
+            raise RuntimeError(
+                f"LSTMStream: Kerasバックエンド '{backend.backend()}' では状態が保持されないため逐次推論は使えません"
+                f"（対応: {', '.join(_SUPPORTED_BACKENDS)}）"
+            )
+
+        self.scalers            = list(scalers)
+        self.batch_size         = len(self.scalers)
+        self.sequence_length    = sequence_length
+        self.resync_every       = resync_every or sequence_length
+        self.n_features         = len(FEATURES)
+        self.model              = _BuildStatefulModel(model, self.batch_size, self.n_features)
+        self.window             = None   # (銘柄, sequence_length, 特徴量) スケーリング済みの直近ウィンドウ
+        self.steps_since_sync   = 0
+
+    def _scale(self, rows):
+        # rows: (銘柄, 本数, 特徴量) → 銘柄ごとのスケーラで変換
+        return np.stack([
+            fs.transform(r) for (fs, _), r in zip(self.scalers, rows)
+        ]).astype(np.float32)
+
+    def _inverse(self, pred_scaled):
+        # pred_scaled: (銘柄, 予測ステップ) → 価格
+        return np.stack([
+            ts.inverse_transform(p.reshape(-1, 1)).flatten() for (_, ts), p in zip(self.scalers, pred_scaled)
+        ])
+
+    def _run(self, x, mode):
+        start = time.perf_counter()
+        pred_scaled = np.asarray(self.model.predict_on_batch(x))
+        LSTM_STREAM_SECONDS.observe(time.perf_counter() - start, mode=mode)
+        return self._inverse(pred_scaled)
+
+    def _resync(self):
+        _ResetStates(self.model)
+        self.steps_since_sync = 0
+        return self._run(self.window, "resync")
+
+    def resync(self, windows, scaled=False):
+        """
+        直近ウィンドウ全体から状態を作り直して予測
+        - windows: (銘柄, sequence_length, 特徴量)。scaled=False なら生の特徴量（FEATURES順）
+        - 戻り値: (銘柄, 予測ステップ) の予測終値
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        if windows.shape != (self.batch_size, self.sequence_length, self.n_features):
+            raise ValueError(f"LSTMStream: ウィンドウ形状が不正 {windows.shape}")
+        self.window = windows.astype(np.float32) if scaled else self._scale(windows)
+        return self._resync()
+
+    def step(self, rows):
+        """
+        確定した足1本分（銘柄ごとの生の特徴量 (銘柄, 特徴量)）で状態を1ステップ進めて予測
+        - resync_every 本に達したら、ウィンドウ全体からの再同期で代える
+        - 戻り値: (銘柄, 予測ステップ) の予測終値
+        """
+        if self.window is None:
+            raise RuntimeError("LSTMStream: resync() で初期化してから step() を呼んでください")
+
+        rows = np.asarray(rows, dtype=np.float64).reshape(self.batch_size, 1, self.n_features)
+        scaled = self._scale(rows)
+        self.window = np.concatenate([self.window[:, 1:], scaled], axis=1)
+
+        self.steps_since_sync += 1
+        if self.steps_since_sync >= self.resync_every:
+            return self._resync()
+        return self._run(scaled, "step")
+
+# ===================================================
+# 学習済み一式（単一銘柄）から逐次推論器を作り、最新ウィンドウで初期化
+# ===================================================
+def LSTMStream_FromBundle(bundle, resync_every=None):
+    streamer = LSTMStreamer(bundle["model"], [(bundle["feature_scaler"], bundle["target_scaler"])],
+                            bundle["sequence_length"], resync_every)
+    window = bundle["X_scaled"][-bundle["sequence_length"]:]
+    streamer.resync(window[np.newaxis], scaled=True)
+    return streamer
+
+# ===================================================
+# 確定足1本分の特徴量行をdfから取り出す（step()への入力用）
+# ===================================================
+def LSTMStream_FeatureRow(df, position=-1):
+    return df[FEATURES].iloc[position].to_numpy(dtype=np.float64)
@@ -1,8 +1,11 @@
+import operator
 import numpy                as np
 
 from sklearn.linear_model   import LinearRegression
 from ta.trend               import ADXIndicator, PSARIndicator
 
+from Framework.Utility.MemoryCore   import MemoryCore_Load
+
 def __PhaseA_Filter(df, period=90, slope_threshold=0.01, adx_threshold=25, verbose=True):
     """
     t-1時点を基点に、トレンド方向を 'uptrend', 'downtrend', 'no_trend' のいずれかで判定。
@@ -85,26 +88,193 @@ def __PhaseA_Filter(df, period=90, slope_threshold=0.01, adx_threshold=25, verbo
     return result
 
 def SignalEngine_PhaseA_Filter(df, period=90, slope_threshold=0.05, adx_threshold=25, verbose=False):
-    labels = [None] * len(df)
-
-    for i in range(period, len(df)):
-        sub_df = df.iloc[:i+1]  # 過去i本まで（t=iが現在）
-        result = __PhaseA_Filter( sub_df,
-                                  period=period,
-                                  slope_threshold=slope_threshold,
-                                  adx_threshold=adx_threshold,
-                                  verbose=verbose
-                                )
-        labels[i] = result
+    """
+    __PhaseA_Filter と同じ判定を全バーに対して一括（ベクトル化）で行う。
+    - バーiのラベルは、終値 i-period〜i-1 の回帰傾きと、t-1（i-1）時点の指標で判定
+    - 先頭period本は None
+    """
+    n = len(df)
+    labels = np.full(n, None, dtype=object)
+
+    if n > period:
+        # ADX / PSAR が無ければここで補完
+        if "ADX_14" not in df.columns:
+            adx_calc = ADXIndicator(high=df["high"], low=df["low"], close=df["close"], window=14)
+            df["ADX_14"] = adx_calc.adx()
+            df["+DI"] = adx_calc.adx_pos()
+            df["-DI"] = adx_calc.adx_neg()
+        if "PSAR" not in df.columns:
+            psar_calc = PSARIndicator(high=df["high"], low=df["low"], close=df["close"])
+            df["PSAR"] = psar_calc.psar()
+
+        # 線形回帰の傾き：Σ(x - x̄)(y - ȳ) / Σ(x - x̄)^2 = Σ(x - x̄)y / Σ(x - x̄)^2
+        close = df["close"].to_numpy(dtype=np.float64)
+        x = np.arange(period, dtype=np.float64) - (period - 1) / 2.0
+        slope = np.correlate(close, x, mode="valid")[:n - period] / np.dot(x, x)
+
+        # t-1 時点の値（ラベル位置 period〜n-1 に対応）
+        def prev(column):
+            return df[column].to_numpy(dtype=np.float64)[period - 1:n - 1]
+
+        adx_val  = prev("ADX_14")
+        plus_di  = prev("+DI")
+        minus_di = prev("-DI")
+        sma20    = prev("SMA_20")
+        sma50    = prev("SMA_50")
+        psar_val = prev("PSAR")
+        price_t1 = close[period - 1:n - 1]
+
+        up = (
+            (slope > slope_threshold) &
+            (adx_val > adx_threshold) &
+            (sma20 > sma50) &
+            (plus_di > minus_di) &
+            (psar_val < price_t1)
+        )
+        down = (
+            (slope < -slope_threshold) &
+            (adx_val > adx_threshold) &
+            (sma20 < sma50) &
+            (minus_di > plus_di) &
+            (psar_val > price_t1)
+        )
+        labels[period:] = np.where(up, "uptrend", np.where(down, "downtrend", "no_trend"))
+
+        # 判定ログは最新バーのみ出力
+        if verbose:
+            __PhaseA_Filter(df, period, slope_threshold, adx_threshold, verbose=True)
 
     df["Trend_Label"] = labels
     return df
 
-def SignalEngine_PhaseB_Trigger(df):
-    result = False
+# ---------------------------------------------------
+# PhaseBのルール定義ファイルと演算子
+# ---------------------------------------------------
+PHASEB_RULES_FILE = "Asset/Config/PhaseBRules.yaml"
+
+_PHASEB_OPS = {
+    ">"  : operator.gt,
+    ">=" : operator.ge,
+    "<"  : operator.lt,
+    "<=" : operator.le,
+    "==" : operator.eq,
+    "!=" : operator.ne,
+}
+
+# ルールファイルのハッシュ -> コンパイル済みルール
+_PhaseB_RulesCache = {}
+
+def SignalEngine_PhaseB_Compile(config):
+    """
+    宣言的なルール定義（dict）を NumPy マスク関数のタプルに変換する。
+    戻り値: {"buy": ((feature, mask_fn, 説明), ...), "sell": (...)}
+    """
+    compiled = {}
+    for side in ("buy", "sell"):
+        rules = []
+        for rule in config.get(side) or []:
+            feature, op, value = rule["feature"], rule["op"], rule["value"]
+            if op == "between":
+                low, high = value
+                mask_fn = lambda x, low=low, high=high: (x >= low) & (x <= high)
+            elif op in _PHASEB_OPS:
+                mask_fn = lambda x, fn=_PHASEB_OPS[op], value=value: fn(x, value)
+            else:
+                raise ValueError(f"PhaseB: 未対応の演算子です: {op}")
+            rules.append((feature, mask_fn, f"{feature} {op} {value}"))
+        compiled[side] = tuple(rules)
+    return compiled
+
+def SignalEngine_PhaseB_LoadRules(path=PHASEB_RULES_FILE):
+    """
+    ルールファイルを読み込んでコンパイル（内容ハッシュ単位でキャッシュ）
+    """
+    config, digest = MemoryCore_Load(path)
+    if digest not in _PhaseB_RulesCache:
+        _PhaseB_RulesCache[digest] = SignalEngine_PhaseB_Compile(config)
+    return _PhaseB_RulesCache[digest]
+
+def __PhaseB_Features(df, forecasts):
+    """
+    ルールが参照する特徴量を遅延計算して返す関数を作る
+    - forecasts: (len(df), 5) のLSTM予測（行iはバーiの確定後に出した予測、無ければNaN）
+    """
+    cache = {}
+
+    def atr():
+        # ATRが0の足（計算開始直後）は判定不能としてNaN扱い
+        value = df["ATR_14"].to_numpy(dtype=np.float64)
+        return np.where(value > 0, value, np.nan)
+
+    def get(feature):
+        if feature in cache:
+            return cache[feature]
+
+        if feature == "forecast_slope_atr":
+            # 予測ホライズン 1〜N に対する回帰傾き
+            steps = forecasts.shape[1]
+            weights = np.arange(steps, dtype=np.float64) - (steps - 1) / 2.0
+            value = (forecasts @ weights) / np.dot(weights, weights) / atr()
+        elif feature == "support_distance_atr":
+            value = (df["close"].to_numpy(dtype=np.float64) - df["Support"].to_numpy(dtype=np.float64)) / atr()
+        elif feature == "resistance_distance_atr":
+            value = (df["Resistance"].to_numpy(dtype=np.float64) - df["close"].to_numpy(dtype=np.float64)) / atr()
+        else:
+            value = df[feature].to_numpy()
+
+        cache[feature] = value
+        return value
+
+    return get
+
+def __PhaseB_Masks(df, forecasts, rules):
+    forecasts = np.asarray(forecasts, dtype=np.float64).reshape(len(df), -1)
+    get = __PhaseB_Features(df, forecasts)
+
+    masks = {}
+    for side in ("buy", "sell"):
+        masks[side] = [(description, np.asarray(mask_fn(get(feature)), dtype=bool))
+                       for feature, mask_fn, description in rules[side]]
+    return masks
+
+def SignalEngine_PhaseB_Evaluate(df, forecasts, rules=None):
+    """
+    全バーのPhaseB判定を一括で行う（バックテスト用）
+    - 戻り値: int8配列（1=BUY, -1=SELL, 0=NO-TRADE）
+    """
+    rules = rules or SignalEngine_PhaseB_LoadRules()
+    masks = __PhaseB_Masks(df, forecasts, rules)
+
+    n = len(df)
+    buy = np.logical_and.reduce([m for _, m in masks["buy"]]) if masks["buy"] else np.zeros(n, dtype=bool)
+    sell = np.logical_and.reduce([m for _, m in masks["sell"]]) if masks["sell"] else np.zeros(n, dtype=bool)
+
+    signal = np.zeros(n, dtype=np.int8)
+    signal[buy & ~sell] = 1
+    signal[sell & ~buy] = -1
+    return signal
+
+def SignalEngine_PhaseB_Trigger(df, predicted_prices, rules=None):
+    """
+    最新の確定足（dfの最終行）に対するPhaseB判定（実戦用）
+    - Evaluate と同じコンパイル済みルールを1行分だけ評価する
+    - 戻り値: ("BUY" | "SELL" | "NO-TRADE", 理由)
+    """
+    result = "NO-TRADE"
+
+    try:
+        rules = rules or SignalEngine_PhaseB_LoadRules()
+        masks = __PhaseB_Masks(df.iloc[-1:], [predicted_prices], rules)
+        failed = {side: [desc for desc, m in masks[side] if not m[0]] for side in ("buy", "sell")}
 
-    # try:
-    # except Exception as e:
-        # return "NO-TRADE", f"PhaseB エラー: {str(e)}"
-    
-    return result
\ No newline at end of file
+        buy = bool(masks["buy"]) and not failed["buy"]
+        sell = bool(masks["sell"]) and not failed["sell"]
+        if buy and not sell:
+            return "BUY", "全条件成立"
+        if sell and not buy:
+            return "SELL", "全条件成立"
+        if buy and sell:
+            return result, "買い・売りの両条件が成立"
+        return result, f"買い不成立[{', '.join(failed['buy'])}] / 売り不成立[{', '.join(failed['sell'])}]"
+    except Exception as e:
+        return result, f"PhaseB エラー: {str(e)}"
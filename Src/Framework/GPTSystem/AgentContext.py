@@ -0,0 +1,144 @@
+# ===================================================
+# AgentContext.py
+# - ルークに渡すシステムプロンプトの構築
+# - MemoryCore（人格データ・トレード方針）を優先度順に圧縮し、
+#   トークン予算内に収めた上で最新のインジケータ値を添付する
+# ===================================================
+
+import hashlib
+
+from Framework.Utility.MemoryCore   import MemoryCore_Load
+
+PERSONALITY_FILE    = "PersonalityData.yaml"
+POLICY_FILE         = "TradingPolicy.yaml"
+
+# ---------------------------------------------------
+# プロンプトに含めるセクション（優先度の高い順）
+# - tags / external_files / references などはプロンプトに不要なので除外
+# ---------------------------------------------------
+PERSONALITY_SECTIONS = ["luke_profile", "kaz_profile", "overview"]
+POLICY_SECTIONS      = [
+    "philosophy", "risk_management", "decision_process",
+    "entry_conditions", "non_entry_conditions", "exit_strategy",
+    "trade_rhythm", "decision_factors", "overview"
+]
+
+# ---------------------------------------------------
+# スナップショットに載せるインジケータ列
+# ---------------------------------------------------
+SNAPSHOT_COLUMNS = [
+    "close", "RSI_14", "MACD", "MACD_signal", "SMA_20", "SMA_50",
+    "ATR_14", "ADX_14", "+DI", "-DI", "Support", "Resistance"
+]
+
+# 圧縮済みプロンプトのキャッシュ: (人格hash, 方針hash, 予算) -> プロンプト
+_PromptCache = {}
+
+# ===================================================
+# トークン数の概算
+# - 日本語など非ASCII文字は1文字≒1トークン、ASCIIは4文字≒1トークン
+# ===================================================
+def AgentContext_EstimateTokens(text):
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+# ---------------------------------------------------
+# YAMLの値を1行ずつの箇条書きに平坦化
+# ---------------------------------------------------
+def _Flatten(value, prefix=""):
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                lines.extend(_Flatten(item, f"{prefix}{key}."))
+            elif item is not None:
+                lines.append(f"- {prefix}{key}: {' '.join(str(item).split())}")
+        return lines
+    if isinstance(value, list):
+        return [line for item in value for line in _Flatten(item, prefix)]
+    if value is None:
+        return []
+    label = prefix.rstrip(".")
+    text = " ".join(str(value).split())
+    return [f"- {label}: {text}" if label else f"- {text}"]
+
+# ---------------------------------------------------
+# セクションを優先度順に詰め込み、予算を超える行は捨てる
+# ---------------------------------------------------
+def _Compress(sections, budget):
+    lines = []
+    used = 0
+    for title, body in sections:
+        header = f"## {title}"
+        header_cost = AgentContext_EstimateTokens(header) + 1
+        section_lines = []
+        for line in body:
+            cost = AgentContext_EstimateTokens(line) + 1
+            if used + header_cost + cost > budget:
+                continue
+            if not section_lines:
+                used += header_cost
+            section_lines.append(line)
+            used += cost
+        if section_lines:
+            lines.append(header)
+            lines.extend(section_lines)
+    return "\n".join(lines)
+
+# ===================================================
+# MemoryCoreの圧縮プロンプト
+# - YAMLのパースはMemoryCore側でキャッシュ済み
+# - 圧縮結果も内容ハッシュ単位でキャッシュする
+# ===================================================
+def AgentContext_BuildMemoryPrompt(token_budget=3000):
+    personality, personality_hash = MemoryCore_Load(PERSONALITY_FILE)
+    policy, policy_hash = MemoryCore_Load(POLICY_FILE)
+
+    key = (personality_hash, policy_hash, token_budget)
+    if key in _PromptCache:
+        return _PromptCache[key]
+
+    sections = []
+    for name in PERSONALITY_SECTIONS:
+        if name in personality:
+            sections.append((f"personality.{name}", _Flatten(personality[name])))
+    for name in POLICY_SECTIONS:
+        if name in policy:
+            sections.append((f"trading_policy.{name}", _Flatten(policy[name])))
+
+    prompt = _Compress(sections, token_budget)
+    if len(_PromptCache) >= 32:
+        _PromptCache.clear()
+    _PromptCache[key] = prompt
+    return prompt
+
+# ===================================================
+# 最新インジケータのスナップショット
+# - MTManager_UpdateIndicators の戻り値（df, trend_signal）をそのまま渡す
+# - 最新行は形成中の足なので、確定足（t-1）を採用する
+# ===================================================
+def AgentContext_IndicatorSnapshot(df, trend_signal=None):
+    if df is None or len(df) == 0:
+        return ""
+
+    row = df.iloc[-2] if len(df) >= 2 else df.iloc[-1]
+    lines = [f"- time: {row.name}"]
+    for column in SNAPSHOT_COLUMNS:
+        if column in df.columns and row[column] == row[column]:
+            lines.append(f"- {column}: {row[column]:.4f}")
+    lines.append(f"- trend_signal: {trend_signal or 'no_trend'}")
+    return "## market_snapshot\n" + "\n".join(lines)
+
+# ===================================================
+# システムプロンプト一式
+# - スナップショット分を先に確保し、残りをMemoryCoreに割り当てる
+# - 戻り値: (システムプロンプト, コンテキストハッシュ)
+# ===================================================
+def AgentContext_Build(df=None, trend_signal=None, token_budget=3000):
+    snapshot = AgentContext_IndicatorSnapshot(df, trend_signal)
+    memory_budget = max(token_budget - AgentContext_EstimateTokens(snapshot), 0)
+    memory_prompt = AgentContext_BuildMemoryPrompt(memory_budget)
+
+    system_prompt = memory_prompt if not snapshot else memory_prompt + "\n\n" + snapshot
+    context_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    return system_prompt, context_hash
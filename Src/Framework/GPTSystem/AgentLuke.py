@@ -1,30 +1,55 @@
-import sys
-import os
-import openai
+from collections import OrderedDict
 
-# OPEN AI API_KEYを取得
-api_key = os.getenv("OPENAI_API_KEY")
+from Framework.GPTSystem.AgentContext   import AgentContext_Build
+from Framework.GPTSystem.LLMClient      import OpenAIClient
+from Framework.Utility.Metrics          import Metrics_CacheLookup
 
-def AgentInitialize():
+class AgentLuke:
     """
-    ルークとの連携準備
+    ルークとの対話窓口
+    - システムプロンプトはMemoryCore＋最新インジケータから構築（AgentContext）
+    - 応答は (コンテキストハッシュ, 質問) 単位でメモ化し、同じ足の中での再質問はLLMを呼ばない
     """
-    print("Agent Initialize")
+    def __init__(self, client, token_budget=3000, memo_size=256):
+        self.client         = client
+        self.token_budget   = token_budget
+        self.memo_size      = memo_size
+        self.memo           = OrderedDict()
+        self.df             = None
+        self.trend_signal   = None
+
+    def update_market(self, df, trend_signal=None):
+        """
+        MTManager_UpdateIndicators の結果をコンテキストに反映
+        """
+        self.df             = df
+        self.trend_signal   = trend_signal
+
+    def ask(self, question):
+        # MemoryCoreが更新されていればここで再構築される（未更新ならキャッシュ）
+        system_prompt, context_hash = AgentContext_Build(self.df, self.trend_signal, self.token_budget)
+
+        key = (context_hash, question)
+        Metrics_CacheLookup("agent_response", key in self.memo)
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            return self.memo[key]
 
-    # パーソナルデータの構築
-    #with open("lukes_personality_20250619.txt", "r", encoding="utf-8") as f:
-    #system_prompt = f.read()
+        response = self.client.complete(system_prompt, question)
 
-    #messages = [
-    #    {"role": "system", "content": system_prompt},
-    #    {"role": "user", "content": "現在のドル円相場の見通しは？"}
-    #]
+        self.memo[key] = response
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return response
+
+def AgentInitialize(client=None, token_budget=3000):
+    """
+    ルークとの連携準備
+    - client未指定時はOpenAIを利用（検証時は LocalLLMClient を渡す）
+    """
+    print("Agent Initialize")
 
-    #response = openai.ChatCompletion.create(
-    #    model="gpt-4",
-    #    messages=messages
-    #)
+    if client is None:
+        client = OpenAIClient()
 
-    # 関数で行う処理
-    # APIキーの設定
-    #openai.api_key = "APIキー" 
\ No newline at end of file
+    return AgentLuke(client, token_budget)
@@ -0,0 +1,62 @@
+# ===================================================
+# LLMClient.py
+# - ルークが利用するLLMの呼び出し口
+# - 本番はOpenAI、検証時は決定的に応答するローカル代替モデルを差し替えて使う
+# ===================================================
+
+import os
+import hashlib
+
+class LLMClient:
+    """
+    LLMクライアントのインターフェース
+    - complete(system_prompt, question) -> 応答文字列
+    """
+    model_name = "base"
+
+    def complete(self, system_prompt, question):
+        raise NotImplementedError
+
+class OpenAIClient(LLMClient):
+    """
+    OpenAI Chat Completions APIを利用するクライアント
+    - APIキーは環境変数 OPENAI_API_KEY から取得
+    """
+    def __init__(self, model_name="gpt-4"):
+        import openai
+
+        self.model_name = model_name
+        self.api_key    = os.getenv("OPENAI_API_KEY")
+        self.openai     = openai
+
+    def complete(self, system_prompt, question):
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": question}
+        ]
+
+        # openai>=1.0 はクライアントオブジェクト経由、旧版は ChatCompletion
+        if hasattr(self.openai, "OpenAI"):
+            client = self.openai.OpenAI(api_key=self.api_key)
+            response = client.chat.completions.create(model=self.model_name, messages=messages)
+            return response.choices[0].message.content
+
+        self.openai.api_key = self.api_key
+        response = self.openai.ChatCompletion.create(model=self.model_name, messages=messages)
+        return response["choices"][0]["message"]["content"]
+
+class LocalLLMClient(LLMClient):
+    """
+    ネットワークを使わない決定的な代替モデル（検証用）
+    - 同じ入力には常に同じ応答を返す
+    - 呼び出し回数を数えるので、メモ化が効いているか確認できる
+    """
+    model_name = "local-echo"
+
+    def __init__(self):
+        self.call_count = 0
+
+    def complete(self, system_prompt, question):
+        self.call_count += 1
+        digest = hashlib.sha256((system_prompt + "\n" + question).encode("utf-8")).hexdigest()[:12]
+        return f"[{self.model_name}:{digest}] {question}"
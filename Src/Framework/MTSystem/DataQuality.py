@@ -0,0 +1,151 @@
+# ===================================================
+# DataQuality.py
+# - MT5から取得したローソク足の品質チェックを行うモジュール
+# - インジケータ計算・LSTM学習の前段で、修復できるものは修復し、
+#   修復できないものはフラグとして残す（全てNumPyでベクトル化）
+# ===================================================
+
+import  numpy                                   as np
+import  MetaTrader5                             as mt5
+
+# ---------------------------------------------------
+# 時間足ごとの想定バー間隔（秒）
+# ---------------------------------------------------
+TIMEFRAME_SECONDS = {
+    mt5.TIMEFRAME_M1  : 60,
+    mt5.TIMEFRAME_M5  : 5 * 60,
+    mt5.TIMEFRAME_M15 : 15 * 60,
+    mt5.TIMEFRAME_M30 : 30 * 60,
+    mt5.TIMEFRAME_H1  : 60 * 60,
+    mt5.TIMEFRAME_H4  : 4 * 60 * 60,
+    mt5.TIMEFRAME_D1  : 24 * 60 * 60,
+    mt5.TIMEFRAME_W1  : 7 * 24 * 60 * 60,
+}
+
+# ---------------------------------------------------
+# DQ_Flags列のビット定義（0 = 問題なし）
+# ---------------------------------------------------
+DQ_GAP          = 1     # 想定外の欠損（週末以外でバーが飛んでいる）
+DQ_ZERO_VOLUME  = 2     # tick_volumeが0
+DQ_OUTLIER      = 4     # 終値リターンが外れ値
+DQ_OHLC_FIXED   = 8     # OHLCの不整合を修復した
+
+_WEEK_SEC       = 7 * 24 * 60 * 60
+_SATURDAY_SEC   = 2 * 24 * 60 * 60     # 1970-01-03（土）00:00 UTC
+_WEEKEND_SEC    = 3 * 24 * 60 * 60     # 週末クローズとして許容する追加間隔
+
+# ---------------------------------------------------
+# DatetimeIndex → UNIX秒（pandasの内部解像度に依存しない）
+# ---------------------------------------------------
+def _EpochSeconds(index):
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+# ===================================================
+# ローソク足の品質チェック＆修復
+# - 入力: DatetimeIndex（tz付き）でOHLCV列を持つDataFrame
+# - 出力: 修復済みdf（DQ_Flags列付き）と件数レポート（dict）
+# - 修復: 時系列ソート、重複タイムスタンプ除去（後勝ち）、
+#         非正値/非有限価格の行除去、high/lowの包絡修正
+# - フラグ: 週末以外のギャップ、出来高0、外れ値リターン
+# ===================================================
+def DataQuality_Validate(df, timeFrame = mt5.TIMEFRAME_D1, outlier_threshold = 10.0, verbose = True):
+    report = {
+        "rows_in"        : len(df),
+        "unsorted"       : 0,
+        "duplicates"     : 0,
+        "invalid_prices" : 0,
+        "ohlc_fixed"     : 0,
+        "gaps"           : 0,
+        "weekend_gaps"   : 0,
+        "zero_volume"    : 0,
+        "outliers"       : 0,
+        "rows_out"       : 0,
+    }
+
+    if len(df) == 0:
+        df["DQ_Flags"] = np.zeros(0, dtype=np.int8)
+        return df, report
+
+    # --- タイムスタンプの単調性（逆行があればソート）
+    times = df.index.asi8
+    if np.any(times[1:] < times[:-1]):
+        report["unsorted"] = int(np.count_nonzero(times[1:] < times[:-1]))
+        order = np.argsort(times, kind="stable")
+        df = df.iloc[order]
+        times = times[order]
+
+    # --- 重複タイムスタンプ（後から来た方を正とする）
+    dup = np.zeros(len(times), dtype=bool)
+    dup[:-1] = times[:-1] == times[1:]
+    if dup.any():
+        report["duplicates"] = int(dup.sum())
+        df = df[~dup]
+        times = times[~dup]
+
+    # --- 価格の妥当性（NaN/inf/0以下は修復不能なので除外）
+    ohlc = df[["open", "high", "low", "close"]].to_numpy(dtype=np.float64)
+    invalid = ~np.isfinite(ohlc).all(axis=1) | (ohlc <= 0).any(axis=1)
+    if invalid.any():
+        report["invalid_prices"] = int(invalid.sum())
+        df = df[~invalid]
+        times = times[~invalid]
+        ohlc = ohlc[~invalid]
+
+    df = df.copy()
+    flags = np.zeros(len(df), dtype=np.int8)
+
+    # --- OHLC整合性（high >= max(open, close, low), low <= min(open, close, high)）
+    row_max = ohlc.max(axis=1)
+    row_min = ohlc.min(axis=1)
+    broken = (ohlc[:, 1] < row_max) | (ohlc[:, 2] > row_min)
+    if broken.any():
+        report["ohlc_fixed"] = int(broken.sum())
+        df["high"] = row_max
+        df["low"] = row_min
+        flags[broken] |= DQ_OHLC_FIXED
+
+    # --- バー間隔（週末を跨ぐギャップは正常扱い）
+    spacing = TIMEFRAME_SECONDS.get(timeFrame)
+    if spacing is not None and len(times) >= 2:
+        sec = _EpochSeconds(df.index)
+        delta = np.diff(sec)
+        over = delta > spacing
+        # 区間(prev, next]に土曜00:00(UTC)を含めば週末クローズ
+        crosses_weekend = ((sec[1:] - _SATURDAY_SEC) // _WEEK_SEC) > ((sec[:-1] - _SATURDAY_SEC) // _WEEK_SEC)
+        weekend = over & crosses_weekend & (delta <= spacing + _WEEKEND_SEC)
+        gap = over & ~weekend
+        report["weekend_gaps"] = int(weekend.sum())
+        report["gaps"] = int(gap.sum())
+        flags[1:][gap] |= DQ_GAP
+
+    # --- 出来高0
+    if "volume" in df.columns:
+        zero_volume = df["volume"].to_numpy() <= 0
+        report["zero_volume"] = int(zero_volume.sum())
+        flags[zero_volume] |= DQ_ZERO_VOLUME
+
+    # --- 外れ値リターン（対数リターンのロバストzスコア：中央値/MAD基準）
+    if len(df) >= 3:
+        returns = np.diff(np.log(df["close"].to_numpy(dtype=np.float64)))
+        median = np.median(returns)
+        mad = np.median(np.abs(returns - median))
+        if mad > 0:
+            zscore = 0.6745 * (returns - median) / mad
+            outlier = np.abs(zscore) > outlier_threshold
+            report["outliers"] = int(outlier.sum())
+            flags[1:][outlier] |= DQ_OUTLIER
+
+    df["DQ_Flags"] = flags
+    report["rows_out"] = len(df)
+
+    if verbose:
+        print("[INFO] データ品質チェック: "
+              f"入力={report['rows_in']} 出力={report['rows_out']} "
+              f"逆行={report['unsorted']} 重複={report['duplicates']} "
+              f"不正価格={report['invalid_prices']} OHLC修復={report['ohlc_fixed']} "
+              f"欠損={report['gaps']}（週末={report['weekend_gaps']}） "
+              f"出来高0={report['zero_volume']} 外れ値={report['outliers']}")
+
+    return df, report
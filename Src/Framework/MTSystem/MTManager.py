@@ -5,6 +5,7 @@
 # ===================================================
 
 import  os
+import  time
 import  MetaTrader5                             as mt5
 import  pandas                                  as pd
 import  mplfinance                              as mpf
@@ -12,6 +13,8 @@ import  matplotlib.pyplot                       as plt
 import  ta
 from    ta.volatility                           import AverageTrueRange
 from    Framework.ForecastSystem.SignalEngine   import SignalEngine_PhaseA_Filter
+from    Framework.MTSystem.DataQuality          import DataQuality_Validate, TIMEFRAME_SECONDS
+from    Framework.Utility.Metrics               import BARS_FETCHED, SIGNALS_EMITTED, CHART_SECONDS, Metrics_CacheLookup
 
 # ---------------------------------------------------
 # 使用する通貨ペア（MT5に接続して有効である必要がある）
@@ -35,28 +38,123 @@ def MTManager_Initialize():
     print("[INFO] MT5接続成功")
     return True
 
-def MTManager_UpdateIndicators(timeFrame = mt5.TIMEFRAME_D1):
+# ---------------------------------------------------
+# 時間足ごとの取得本数
+# ---------------------------------------------------
+_HISTORY_BARS = {
+    mt5.TIMEFRAME_D1 : 600,     # LONG(日足)バージョン
+    mt5.TIMEFRAME_W1 : 200,
+}
+_HISTORY_BARS_DEFAULT   = 3000  # SHORT(15分足)バージョン
+_FETCH_BARS_MAX         = 100000
 
-    # LONG(日足)バージョン
-    if timeFrame == mt5.TIMEFRAME_D1:
-        _days_back=600
-    # SHORT(15分足)バージョン
-    else:
-        _days_back=3000
-    print("[INFO] インジケータ更新と学習開始")
+# ---------------------------------------------------
+# 時間足ごとのPhaseAパラメータ（period, slope_threshold, adx_threshold）
+# ---------------------------------------------------
+_PHASEA_PARAMS = {
+    mt5.TIMEFRAME_D1 : (60, 0.005, 20),     # LONG(日足)バージョン
+    mt5.TIMEFRAME_W1 : (26, 0.02, 20),      # 週足（コンフルエンス用の暫定値）
+}
+_PHASEA_PARAMS_DEFAULT  = (45, 0.0015, 20)  # SHORT(15分足)バージョン
+
+# リサンプリングの基準（1970-01-04 日曜 00:00 = MT5の週足の開始）
+_RESAMPLE_ORIGIN = pd.Timestamp("1970-01-04", tz="UTC")
 
-    # MT5からローソク足データを取得（最新からdays_back件分）
-    rates = mt5.copy_rates_from_pos(symbol, timeFrame, 0, _days_back)
+# 時間足 -> (df, trend_signal)：コンフルエンスで計算した結果を後段で再利用
+_IndicatorCache = {}
+
+# ===================================================
+# MT5からローソク足を取得し、データ品質チェックまで行う
+# ===================================================
+def MTManager_FetchRates(timeFrame = mt5.TIMEFRAME_D1, count = None):
+    if count is None:
+        count = _HISTORY_BARS.get(timeFrame, _HISTORY_BARS_DEFAULT)
+
+    # MT5からローソク足データを取得（最新からcount件分）
+    rates = mt5.copy_rates_from_pos(symbol, timeFrame, 0, count)
     if rates is None or len(rates) == 0:
         print("[ERROR] データ取得失敗")
         return None
 
+    return _RatesToFrame(pd.DataFrame(rates), timeFrame)
+
+# ---------------------------------------------------
+# ローソク足の生データ → JST DatetimeIndex付きdf＋データ品質チェック
+# ---------------------------------------------------
+def _RatesToFrame(df, timeFrame):
     # データフレーム化・インデックス変換
-    df = pd.DataFrame(rates)
     df['time'] = pd.to_datetime(df['time'], unit='s', utc=True).dt.tz_convert('Asia/Tokyo')
     df.set_index("time", inplace=True)
     df.rename(columns={"tick_volume": "volume"}, inplace=True)
+    BARS_FETCHED.inc(len(df), timeframe=timeFrame)
 
+    # ===================================================
+    # データ品質チェック（ソート・重複除去・OHLC修復、欠損/外れ値はフラグ）
+    # ===================================================
+    df, dq_report = DataQuality_Validate(df, timeFrame)
+    df.attrs["DataQuality"] = dq_report
+    return df
+
+# ===================================================
+# 期間指定でローソク足を取得（過去シグナルのレポート用）
+# - warmup本だけ開始日時より前の足も取得する（インジケータ・LSTM学習用）
+# ===================================================
+def MTManager_FetchRatesRange(start, end, timeFrame = mt5.TIMEFRAME_D1, warmup = 0, symbolName = None):
+    symbolName = symbolName or symbol
+    start = pd.Timestamp(start).to_pydatetime()
+    end = pd.Timestamp(end).to_pydatetime()
+
+    frames = []
+    if warmup > 0:
+        rates = mt5.copy_rates_from(symbolName, timeFrame, start, warmup)
+        if rates is not None and len(rates) > 0:
+            frames.append(pd.DataFrame(rates))
+
+    rates = mt5.copy_rates_range(symbolName, timeFrame, start, end)
+    if rates is None or len(rates) == 0:
+        print("[ERROR] データ取得失敗:", symbolName, mt5.last_error())
+        return None
+    frames.append(pd.DataFrame(rates))
+
+    # 境界の足は両方に含まれ得るが、重複はデータ品質チェックで除去される
+    return _RatesToFrame(pd.concat(frames, ignore_index=True), timeFrame)
+
+# ===================================================
+# リプレイCSVからローソク足を読み込む（MT5接続なしでのレポート用）
+# - 列: time（UNIX秒 or 日時文字列）, open, high, low, close, tick_volume（またはvolume）
+# ===================================================
+def MTManager_LoadReplay(path, timeFrame = mt5.TIMEFRAME_D1):
+    df = pd.read_csv(path)
+    if not pd.api.types.is_numeric_dtype(df["time"]):
+        times = pd.to_datetime(df["time"])
+        if times.dt.tz is None:
+            times = times.dt.tz_localize("UTC")
+        df["time"] = (times - pd.Timestamp("1970-01-01", tz="UTC")) // pd.Timedelta(seconds=1)
+    return _RatesToFrame(df, timeFrame)
+
+# ===================================================
+# 細かい時間足のローソク足を粗い時間足へ集約（再取得なし）
+# - MT5のtimeはサーバ時刻なので、UTC扱いのまま区切ってからJSTに戻す
+# ===================================================
+def MTManager_Resample(df, timeFrame):
+    rule = pd.Timedelta(seconds=TIMEFRAME_SECONDS[timeFrame])
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    if "spread" in df.columns:
+        agg["spread"] = "max"
+    if "real_volume" in df.columns:
+        agg["real_volume"] = "sum"
+
+    src = df[list(agg)]
+    src.index = src.index.tz_convert("UTC")
+    out = src.resample(rule, origin=_RESAMPLE_ORIGIN).agg(agg).dropna(subset=["close"])
+    out.index = out.index.tz_convert(df.index.tz)
+    return out
+
+# ===================================================
+# インジケータ計算＋PhaseAトレンドラベル付与
+# - 取得済みのdfに対して計算する（MT5にはアクセスしない）
+# ===================================================
+def MTManager_ComputeIndicators(df, timeFrame = mt5.TIMEFRAME_D1):
     # ===================================================
     # テクニカル指標の計算
     # ===================================================
@@ -94,16 +192,7 @@ def MTManager_UpdateIndicators(timeFrame = mt5.TIMEFRAME_D1):
     # ===================================================
     # チャート描画用トレンドラベルを追記
     # ===================================================
-    # LONG(日足)バージョン
-    if timeFrame == mt5.TIMEFRAME_D1:
-        _period             = 60
-        _slope_threshold    = 0.005
-        _adx_threshold      = 20
-    # SHORT(15分足)バージョン
-    else:
-        _period             = 45
-        _slope_threshold    = 0.0015
-        _adx_threshold      = 20
+    _period, _slope_threshold, _adx_threshold = _PHASEA_PARAMS.get(timeFrame, _PHASEA_PARAMS_DEFAULT)
 
     df = SignalEngine_PhaseA_Filter(df, _period, _slope_threshold, _adx_threshold, verbose=False)
 
@@ -118,84 +207,152 @@ def MTManager_UpdateIndicators(timeFrame = mt5.TIMEFRAME_D1):
             print(f"[SIGNAL] 前日のシグナル：{trend_label}")
         else:
             print("[SIGNAL] 前日はノーシグナル")
+        SIGNALS_EMITTED.inc(timeframe=timeFrame, label=trend_signal or "no_trend")
 
     return df, trend_signal
 
+def MTManager_UpdateIndicators(timeFrame = mt5.TIMEFRAME_D1, use_cache = False):
+
+    # コンフルエンスで計算済みならそれを使う（MT5再取得・再計算なし）
+    if use_cache:
+        Metrics_CacheLookup("indicators", timeFrame in _IndicatorCache)
+        if timeFrame in _IndicatorCache:
+            df, trend_signal = _IndicatorCache[timeFrame]
+            print("[INFO] インジケータ：キャッシュを使用")
+            return df.copy(), trend_signal
+        print("[WARN] インジケータ：キャッシュなし → MT5から再取得（コンフルエンス時間足に含まれていない）")
+
+    print("[INFO] インジケータ更新と学習開始")
+
+    df = MTManager_FetchRates(timeFrame)
+    if df is None:
+        return None
+
+    return MTManager_ComputeIndicators(df, timeFrame)
+
 # ===================================================
-# 日足データ取得＆インジケータ追加
-# - 最新日から過去へ指定数分取得（営業日ベース）
-# - RSI・MACD・サポレジを計算し、チャートを表示
+# 複数時間足のコンフルエンス判定
+# - 最も細かい時間足だけをMT5から取得し、粗い時間足はリサンプリングで作る
+# - 全時間足のPhaseAラベルを計算し、t-1のシグナルが全て一致した時のみ採用
+# - 各時間足の結果はキャッシュし、チャート/LSTM段で use_cache=True で再利用
 # ===================================================
-def MTManager_DrawChart(df, timeFrame = mt5.TIMEFRAME_D1):
+def MTManager_UpdateConfluence(timeFrames = (mt5.TIMEFRAME_D1, mt5.TIMEFRAME_W1)):
+    print("[INFO] コンフルエンス判定開始")
+
+    base = min(timeFrames, key=lambda tf: TIMEFRAME_SECONDS[tf])
+    count = max(
+        _HISTORY_BARS.get(tf, _HISTORY_BARS_DEFAULT) * TIMEFRAME_SECONDS[tf] // TIMEFRAME_SECONDS[base]
+        for tf in timeFrames
+    )
+    base_df = MTManager_FetchRates(base, min(count, _FETCH_BARS_MAX))
+    if base_df is None:
+        return None, None
+
+    _IndicatorCache.clear()
+    signals = []
+    for tf in timeFrames:
+        tf_df = base_df if tf == base else MTManager_Resample(base_df, tf)
+        tf_df = tf_df.iloc[-_HISTORY_BARS.get(tf, _HISTORY_BARS_DEFAULT):].copy()
+        tf_df, tf_signal = MTManager_ComputeIndicators(tf_df, tf)
+        _IndicatorCache[tf] = (tf_df, tf_signal)
+        signals.append(tf_signal)
+
+    combined = None
+    if signals[0] in ["uptrend", "downtrend"] and all(sig == signals[0] for sig in signals):
+        combined = signals[0]
+        print(f"[SIGNAL] コンフルエンス成立：{combined}")
+    else:
+        print(f"[SIGNAL] コンフルエンス不成立：{signals}")
+
+    return {tf: _IndicatorCache[tf] for tf in timeFrames}, combined
+
+# ===================================================
+# チャート描画の共通設定・addplot構築
+# ===================================================
+def _ChartStyle():
     import matplotlib
-    import matplotlib.pyplot as plt
-    import mplfinance as mpf
     import warnings
 
     warnings.filterwarnings("ignore")
     matplotlib.rcParams['font.family'] = 'Meiryo'
 
-    def build_addplots(sub_df):
-        apds = [
-            mpf.make_addplot(sub_df["Support"], panel=0, color='green', linestyle='--', width=1),
-            mpf.make_addplot(sub_df["Resistance"], panel=0, color='red', linestyle='--', width=1),
-            mpf.make_addplot(sub_df["RSI_14"], panel=1, color='purple', ylabel='RSI'),
-            mpf.make_addplot([30]*len(sub_df), panel=1, color='gray', linestyle='--'),
-            mpf.make_addplot([70]*len(sub_df), panel=1, color='gray', linestyle='--'),
-            mpf.make_addplot(sub_df["MACD"], panel=2, color='blue', ylabel='MACD'),
-            mpf.make_addplot(sub_df["MACD_signal"], panel=2, color='orange'),
-            mpf.make_addplot(sub_df["MACD_diff"], panel=2, type='bar', color='dimgray', alpha=0.5)
-        ]
-        if "LSTM_Predicted" in sub_df.columns and sub_df["LSTM_Predicted"].notna().sum() >= 2:
-            apds.append(
-                mpf.make_addplot(
-                    sub_df["LSTM_Predicted"],
-                    panel=0,
-                    color='orange',
-                    width=2,
-                    linestyle='-',
-                    label='LSTM Forecast'
-                )
+def _BuildAddplots(sub_df):
+    apds = [
+        mpf.make_addplot(sub_df["Support"], panel=0, color='green', linestyle='--', width=1),
+        mpf.make_addplot(sub_df["Resistance"], panel=0, color='red', linestyle='--', width=1),
+        mpf.make_addplot(sub_df["RSI_14"], panel=1, color='purple', ylabel='RSI'),
+        mpf.make_addplot([30]*len(sub_df), panel=1, color='gray', linestyle='--'),
+        mpf.make_addplot([70]*len(sub_df), panel=1, color='gray', linestyle='--'),
+        mpf.make_addplot(sub_df["MACD"], panel=2, color='blue', ylabel='MACD'),
+        mpf.make_addplot(sub_df["MACD_signal"], panel=2, color='orange'),
+        mpf.make_addplot(sub_df["MACD_diff"], panel=2, type='bar', color='dimgray', alpha=0.5)
+    ]
+    if "LSTM_Predicted" in sub_df.columns and sub_df["LSTM_Predicted"].notna().sum() >= 2:
+        apds.append(
+            mpf.make_addplot(
+                sub_df["LSTM_Predicted"],
+                panel=0,
+                color='orange',
+                width=2,
+                linestyle='-',
+                label='LSTM Forecast'
             )
-        return apds
+        )
+    return apds
+
+# ===================================================
+# ローソク足＋インジケータ＋トレンドラベルのチャートを1枚保存
+# - MTManager_DrawChart とレポート（Report.py）で共通の描画
+# ===================================================
+def MTManager_PlotChart(sub_df, title, filename):
+    _ChartStyle()
+
+    start = time.perf_counter()
+    apds = _BuildAddplots(sub_df)
+    fig, axes = mpf.plot(sub_df,
+                         type='candle',
+                         style='charles',
+                         mav=(5, 25, 75),
+                         volume=True,
+                         addplot=apds,
+                         panel_ratios=(4, 1, 1),
+                         title=title,
+                         ylabel='Price',
+                         ylabel_lower='Volume',
+                         figsize=(14, 10),
+                         returnfig=True)
+
+    ax_price = axes[0]
+    offset = (sub_df["high"].max() - sub_df["low"].min()) * 0.005  # 0.5%幅
+
+    for i in range(len(sub_df)):
+        label = sub_df["Trend_Label"].iloc[i]
+        if label == "uptrend":
+            price = sub_df["low"].iloc[i] - offset
+            ax_price.scatter([i], [price], marker='^', color='green', s=80, zorder=5)
+        elif label == "downtrend":
+            price = sub_df["high"].iloc[i] + offset
+            ax_price.scatter([i], [price], marker='v', color='red', s=80, zorder=5)
+
+    ax_price.set_ylim(sub_df["low"].min() - 3 * offset, sub_df["high"].max() + 3 * offset)
+
+    try:
+        plt.tight_layout()
+    except:
+        pass
+
+    fig.savefig(filename)
+    plt.close(fig)
+    CHART_SECONDS.observe(time.perf_counter() - start, chart=os.path.basename(filename))
 
+# ===================================================
+# 日足データ取得＆インジケータ追加
+# - 最新日から過去へ指定数分取得（営業日ベース）
+# - RSI・MACD・サポレジを計算し、チャートを表示
+# ===================================================
+def MTManager_DrawChart(df, timeFrame = mt5.TIMEFRAME_D1, outputDir = "Asset/Log/ChartImage"):
     def plot_chart(sub_df, title, filename):
-        apds = build_addplots(sub_df)
-        fig, axes = mpf.plot(sub_df,
-                             type='candle',
-                             style='charles',
-                             mav=(5, 25, 75),
-                             volume=True,
-                             addplot=apds,
-                             panel_ratios=(4, 1, 1),
-                             title=title,
-                             ylabel='Price',
-                             ylabel_lower='Volume',
-                             figsize=(14, 10),
-                             returnfig=True)
-
-        ax_price = axes[0]
-        offset = (sub_df["high"].max() - sub_df["low"].min()) * 0.005  # 0.5%幅
-
-        for i in range(len(sub_df)):
-            label = sub_df["Trend_Label"].iloc[i]
-            if label == "uptrend":
-                price = sub_df["low"].iloc[i] - offset
-                ax_price.scatter([i], [price], marker='^', color='green', s=80, zorder=5)
-            elif label == "downtrend":
-                price = sub_df["high"].iloc[i] + offset
-                ax_price.scatter([i], [price], marker='v', color='red', s=80, zorder=5)
-
-        ax_price.set_ylim(sub_df["low"].min() - 3 * offset, sub_df["high"].max() + 3 * offset)
-
-        try:
-            plt.tight_layout()
-        except:
-            pass
-
-        filename = "Asset/Log/ChartImage/" + filename
-        fig.savefig(filename)
-        plt.close(fig)
+        MTManager_PlotChart(sub_df, title, os.path.join(outputDir, filename))
 
     
     if timeFrame == mt5.TIMEFRAME_D1:
@@ -1,9 +1,10 @@
 """
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
 from datetime import datetime
-from Framework.ForecastSystem.SignalEngine import PhaseA_Filter, PhaseB_Trigger
+from Framework.ForecastSystem.SignalEngine import PhaseA_Filter, SignalEngine_PhaseB_Evaluate
 from Framework.MTSystem.MTManager import (
     IsPositionActive,
     SetPositionActive,
@@ -55,6 +56,14 @@ def run_backtest(df, predicted_close, period_days=5, lookback=3, use_trailing_tp
 
     df = df.copy().reset_index(drop=False)
 
+    # PhaseB判定は実戦と同じコンパイル済みルールで全期間を一括評価
+    # （行iの予測 = predicted_close[i:i+5]）
+    pred = np.array([np.nan if p is None else p for p in predicted_close], dtype=np.float64)
+    forecasts = np.full((len(df), 5), np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(pred, 5)[:len(df)]
+    forecasts[:len(windows)] = windows
+    phase_b = SignalEngine_PhaseB_Evaluate(df, forecasts)
+
     for i in range(len(df) - period_days):
         if IsPositionActive(i):
             entry_logs.append({
@@ -81,7 +90,8 @@ def run_backtest(df, predicted_close, period_days=5, lookback=3, use_trailing_tp
             print(f"[SKIP] {df.loc[i, 'time']} - predicted_close不足: {current_pred}")
             continue
 
-        signal, reason_b = PhaseB_Trigger(current_pred, current_df)
+        signal = {1: "BUY", -1: "SELL"}.get(int(phase_b[i]), "NO-TRADE")
+        reason_b = "PhaseBルール不成立"
         if signal == "NO-TRADE":
             entry_logs.append({
                 "date": df.loc[i, "time"],
@@ -0,0 +1,258 @@
+# ===================================================
+# Benchmark.py
+# - MT5ログインなしで各処理段の性能を測るためのベンチマーク基盤
+# - シード固定の合成USDJPY風OHLCVを生成し、段ごと（＋サブ段）と通しで
+#   実行時間・ピークメモリ・スループット（bars/sec）を計測する
+# - 結果はJSONのベースラインとして保存し、後から比較して劣化を検出する
+# ===================================================
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import platform
+import datetime
+import tempfile
+import tracemalloc
+import numpy                as np
+import pandas               as pd
+import MetaTrader5          as mt5
+
+from Framework.MTSystem.DataQuality     import TIMEFRAME_SECONDS
+
+BENCHMARK_DIR   = "Asset/Log/Benchmark"
+DEFAULT_SIZES   = [1_000, 10_000, 100_000, 1_000_000]
+
+_WEEK_SEC       = 7 * 24 * 60 * 60
+_MONDAY_ORIGIN  = pd.Timestamp("2000-01-03")    # 月曜 00:00（サーバ時刻）
+
+# ===================================================
+# 合成OHLCVの生成
+# - 平日のみのタイムスタンプ（週末クローズを再現）
+# - 一定本数ごとにボラティリティとドリフトが切り替わるレジーム構造で、
+#   PhaseAのトレンド判定が適度に発生するようにする
+# - 出力は MTManager_FetchRates と同じ形（Asia/Tokyo の DatetimeIndex）
+# ===================================================
+def Benchmark_SyntheticRates(n_bars, timeFrame = mt5.TIMEFRAME_M15, seed = 0, start_price = 150.0, regime_bars = 500):
+    rng = np.random.default_rng(seed)
+    spacing = TIMEFRAME_SECONDS[timeFrame]
+
+    # --- タイムスタンプ（月〜金のみ）
+    per_week = max(5 * 24 * 60 * 60 // spacing, 1)
+    k = np.arange(n_bars, dtype=np.int64)
+    offset = (k // per_week) * _WEEK_SEC + (k % per_week) * spacing
+    times = _MONDAY_ORIGIN + pd.to_timedelta(offset, unit="s")
+
+    # --- レジームごとのボラティリティ／ドリフト
+    bar_vol = 0.0006 * np.sqrt(spacing / 900)
+    n_regimes = n_bars // regime_bars + 1
+    regime_vol = bar_vol * np.exp(rng.normal(0.0, 0.4, n_regimes))
+    regime_drift = rng.normal(0.0, 0.15, n_regimes) * regime_vol
+    regime = k // regime_bars
+    vol = regime_vol[regime]
+
+    # --- 終値（対数リターンの累積）と始値・高値・安値
+    log_returns = regime_drift[regime] + vol * rng.standard_normal(n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.standard_normal((2, n_bars))) * vol * close * 0.5
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.poisson(200 * vol / bar_vol + 20).astype(np.int64)
+
+    df = pd.DataFrame({
+        "open"          : np.round(open_, 3),
+        "high"          : np.round(high, 3),
+        "low"           : np.round(low, 3),
+        "close"         : np.round(close, 3),
+        "volume"        : volume,
+        "spread"        : np.full(n_bars, 3, dtype=np.int32),
+        "real_volume"   : np.zeros(n_bars, dtype=np.int64),
+    }, index=pd.DatetimeIndex(times, name="time").tz_localize("UTC").tz_convert("Asia/Tokyo"))
+    return df
+
+# ===================================================
+# 1段分の計測
+# - setup() の戻り値を run() に渡す（setupは計測に含めない）
+# - 実行時間は repeat 回の最小値、ピークメモリは tracemalloc で別途1回計測
+# ===================================================
+def Benchmark_Measure(setup, run, bars, repeat = 3, measure_memory = True):
+    wall = []
+    for _ in range(repeat):
+        args = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(args)
+        wall.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if measure_memory:
+        args = setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run(args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+
+    best = min(wall)
+    return {
+        "status"        : "ok",
+        "bars"          : bars,
+        "wall_sec"      : best,
+        "wall_all_sec"  : wall,
+        "peak_mb"       : peak_mb,
+        "bars_per_sec"  : bars / best if best > 0 else None,
+    }
+
+# ---------------------------------------------------
+# ベンチマーク対象の段
+# - (名前, setup(raw_df), run(args), 最大本数) のリスト
+# - 重い処理（LSTM学習・チャート描画）は最大本数を設けて大サイズではスキップ
+# ---------------------------------------------------
+def _Stages(timeFrame, chart_dir, lstm_max_bars):
+    import ta
+    from ta.volatility                          import AverageTrueRange
+    from Framework.MTSystem.DataQuality         import DataQuality_Validate
+    from Framework.MTSystem.MTManager           import MTManager_ComputeIndicators, MTManager_DrawChart
+    from Framework.ForecastSystem.SignalEngine  import SignalEngine_PhaseA_Filter
+
+    def indicators(raw):
+        df, _ = MTManager_ComputeIndicators(raw.copy(), timeFrame)
+        return df
+
+    def lstm(df):
+        from Framework.ForecastSystem.LSTMModel import LSTMModel_PredictLSTM
+        return LSTMModel_PredictLSTM(df.iloc[:-1].copy(), timeFrame, False)
+
+    def end_to_end(raw):
+        df, _ = DataQuality_Validate(raw.copy(), timeFrame, verbose=False)
+        df, _ = MTManager_ComputeIndicators(df, timeFrame)
+        if len(df) <= lstm_max_bars:
+            lstm(df)
+        MTManager_DrawChart(df, timeFrame, chart_dir)
+
+    # PhaseAのparamsはMTManagerと同じ時間足別の値を使う
+    from Framework.MTSystem.MTManager import _PHASEA_PARAMS, _PHASEA_PARAMS_DEFAULT
+    period, slope_threshold, adx_threshold = _PHASEA_PARAMS.get(timeFrame, _PHASEA_PARAMS_DEFAULT)
+
+    copy_raw = lambda raw: (lambda: raw.copy())
+    with_indicators = lambda raw: (lambda: indicators(raw))
+
+    return [
+        ("data_quality",        copy_raw,        lambda df: DataQuality_Validate(df, timeFrame, verbose=False), None),
+        ("indicators",          copy_raw,        lambda df: MTManager_ComputeIndicators(df, timeFrame), None),
+        ("indicators.rsi",      copy_raw,        lambda df: ta.momentum.RSIIndicator(close=df["close"], window=14).rsi(), None),
+        ("indicators.macd",     copy_raw,        lambda df: ta.trend.MACD(close=df["close"]).macd_diff(), None),
+        ("indicators.rolling",  copy_raw,        lambda df: (df["low"].rolling(10).min(), df["high"].rolling(10).max(),
+                                                             df["close"].rolling(20).mean(), df["close"].rolling(50).mean()), None),
+        ("indicators.atr",      copy_raw,        lambda df: AverageTrueRange(high=df["high"], low=df["low"], close=df["close"], window=14).average_true_range(), None),
+        ("indicators.adx",      copy_raw,        lambda df: ta.trend.ADXIndicator(high=df["high"], low=df["low"], close=df["close"], window=14).adx(), None),
+        ("indicators.psar",     copy_raw,        lambda df: ta.trend.PSARIndicator(high=df["high"], low=df["low"], close=df["close"]).psar(), None),
+        ("phase_a",             with_indicators, lambda df: SignalEngine_PhaseA_Filter(df, period, slope_threshold, adx_threshold), None),
+        ("lstm",                with_indicators, lstm, lstm_max_bars),
+        ("chart",               with_indicators, lambda df: MTManager_DrawChart(df, timeFrame, chart_dir), None),
+        ("end_to_end",          copy_raw,        end_to_end, None),
+    ]
+
+# ===================================================
+# ベンチマーク実行
+# - sizes の各本数 × 各段を計測し、JSONに保存できるdictを返す
+# - stages を指定すると名前が前方一致する段のみ実行
+# ===================================================
+def Benchmark_Run(sizes = DEFAULT_SIZES, timeFrame = mt5.TIMEFRAME_M15, seed = 0, repeat = 3,
+                  stages = None, lstm_max_bars = 10_000, measure_memory = True):
+    chart_dir = tempfile.mkdtemp(prefix="sgsystem_bench_")
+    results = {}
+    try:
+        for bars in sizes:
+            raw = Benchmark_SyntheticRates(bars, timeFrame, seed)
+            for name, setup, run, max_bars in _Stages(timeFrame, chart_dir, lstm_max_bars):
+                if stages and not any(name.startswith(prefix) for prefix in stages):
+                    continue
+
+                key = f"{name}@{bars}"
+                if max_bars is not None and bars > max_bars:
+                    results[key] = {"status": "skipped", "bars": bars, "reason": f"bars > {max_bars}"}
+                    continue
+
+                print(f"[BENCH] {key} ...", flush=True)
+                try:
+                    # 重い段は1回だけ
+                    n_repeat = 1 if name in ("lstm", "end_to_end") else repeat
+                    results[key] = Benchmark_Measure(setup(raw), run, bars, n_repeat, measure_memory)
+                    results[key]["stage"] = name
+                    print(f"[BENCH] {key}: {results[key]['wall_sec']:.4f}s  "
+                          f"{results[key]['bars_per_sec']:,.0f} bars/s", flush=True)
+                except ImportError as e:
+                    results[key] = {"status": "skipped", "bars": bars, "reason": str(e)}
+    finally:
+        shutil.rmtree(chart_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created"   : datetime.datetime.now().isoformat(timespec="seconds"),
+            "python"    : sys.version.split()[0],
+            "numpy"     : np.__version__,
+            "pandas"    : pd.__version__,
+            "platform"  : platform.platform(),
+            "timeframe" : timeFrame,
+            "seed"      : seed,
+            "repeat"    : repeat,
+        },
+        "results": results,
+    }
+
+# ===================================================
+# 結果の保存／読み込み
+# ===================================================
+def Benchmark_Save(report, path = None):
+    if path is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(BENCHMARK_DIR, f"benchmark_{stamp}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"[INFO] ベンチマーク結果を保存: {path}")
+    return path
+
+def Benchmark_Load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# ===================================================
+# ベースラインとの比較
+# - 実行時間・ピークメモリが threshold（例: 0.10 = 10%）を超えて悪化した段を劣化とする
+# - 戻り値: 劣化した段のキー一覧
+# ===================================================
+def Benchmark_Compare(baseline, current, threshold = 0.10):
+    regressions = []
+    print(f"{'stage@bars':<32}{'base(s)':>12}{'now(s)':>12}{'ratio':>9}{'mem ratio':>11}")
+    for key, base in baseline["results"].items():
+        now = current["results"].get(key)
+        if base.get("status") != "ok" or not now or now.get("status") != "ok":
+            continue
+
+        ratio = now["wall_sec"] / base["wall_sec"] if base["wall_sec"] > 0 else 1.0
+        mem_ratio = None
+        if base.get("peak_mb") and now.get("peak_mb") is not None:
+            mem_ratio = now["peak_mb"] / base["peak_mb"]
+
+        regressed = ratio > 1.0 + threshold or (mem_ratio is not None and mem_ratio > 1.0 + threshold)
+        if regressed:
+            regressions.append(key)
+
+        mem_text = f"{mem_ratio:.2f}" if mem_ratio is not None else "-"
+        mark = "  << REGRESSION" if regressed else ""
+        print(f"{key:<32}{base['wall_sec']:>12.4f}{now['wall_sec']:>12.4f}{ratio:>9.2f}{mem_text:>11}{mark}")
+
+    if regressions:
+        print(f"[WARN] 劣化を検出（閾値 {threshold:.0%}）: {len(regressions)}件")
+    else:
+        print(f"[INFO] 劣化なし（閾値 {threshold:.0%}）")
+    return regressions
@@ -0,0 +1,59 @@
+# ===================================================
+# MemoryCore.py
+# - Asset/MemoryCore 配下のYAML（人格データ・トレード方針）の読み込み
+# - 一度パースした結果をキャッシュし、更新時刻とハッシュで無効化する
+# ===================================================
+
+import os
+import hashlib
+import yaml
+
+from Framework.Utility.Metrics  import Metrics_CacheLookup
+
+MEMORY_CORE_DIR = "Asset/MemoryCore"
+
+# path -> {"mtime_ns", "size", "hash", "data"}
+_MemoryCoreCache = {}
+
+# ===================================================
+# YAMLの読み込み（キャッシュ付き）
+# - 更新時刻・サイズが変わっていなければファイルを開かずにキャッシュを返す
+# - 更新時刻が変わっても内容のハッシュが同じなら再パースしない
+# - 戻り値: (パース結果, 内容のSHA-256)
+# ===================================================
+def MemoryCore_Load(filename):
+    path = filename if os.path.dirname(filename) else os.path.join(MEMORY_CORE_DIR, filename)
+    stat = os.stat(path)
+
+    entry = _MemoryCoreCache.get(path)
+    if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        Metrics_CacheLookup("memory_core", True)
+        return entry["data"], entry["hash"]
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if entry and entry["hash"] == digest:
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        Metrics_CacheLookup("memory_core", True)
+        return entry["data"], entry["hash"]
+
+    Metrics_CacheLookup("memory_core", False)
+
+    data = yaml.safe_load(raw.decode("utf-8")) or {}
+    _MemoryCoreCache[path] = {
+        "mtime_ns"  : stat.st_mtime_ns,
+        "size"      : stat.st_size,
+        "hash"      : digest,
+        "data"      : data,
+    }
+    print(f"[INFO] MemoryCore読み込み: {path}")
+    return data, digest
+
+# ===================================================
+# キャッシュの破棄（テスト・強制再読み込み用）
+# ===================================================
+def MemoryCore_ClearCache():
+    _MemoryCoreCache.clear()
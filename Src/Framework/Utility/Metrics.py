@@ -0,0 +1,223 @@
+# ===================================================
+# Metrics.py
+# - パイプラインの計測値（カウンタ・ゲージ・ヒストグラム）を保持し、
+#   ローカルHTTPエンドポイントから Prometheus テキスト形式で公開する
+# - 記録側はメトリクス単位の短いロックで数値を足すだけ（描画はスクレイプ時のみ）
+# - main.py は1回実行して終了するため、実行終了時に node_exporter の
+#   textfile collector 用ファイルへ同じ形式で書き出す（HTTPは常駐運用向け）
+# ===================================================
+
+import os
+import time
+import bisect
+import threading
+
+from contextlib     import contextmanager
+from http.server    import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# 名前 -> メトリクス（公開順を保つ）
+_Registry = {}
+_RegistryLock = threading.Lock()
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name       = name
+        self.help_text  = help_text
+        self.labelnames = tuple(labelnames)
+        self.values     = {}
+        self.lock       = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._format_labels(key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, value=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def dec(self, value=1, **labels):
+        self.inc(-value, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=_DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # [バケット別件数..., +Inf件数], 合計, 件数
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self.values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+def _Register(metric):
+    with _RegistryLock:
+        return _Registry.setdefault(metric.name, metric)
+
+# ===================================================
+# メトリクスの生成（同名は既存を返す）
+# ===================================================
+def Metrics_Counter(name, help_text, labelnames=()):
+    return _Register(Counter(name, help_text, labelnames))
+
+def Metrics_Gauge(name, help_text, labelnames=()):
+    return _Register(Gauge(name, help_text, labelnames))
+
+def Metrics_Histogram(name, help_text, labelnames=(), buckets=_DEFAULT_BUCKETS):
+    return _Register(Histogram(name, help_text, labelnames, buckets))
+
+# ---------------------------------------------------
+# SGSystem 標準メトリクス
+# ---------------------------------------------------
+STAGE_SECONDS       = Metrics_Histogram("sgsystem_stage_duration_seconds", "Pipeline stage latency", ["stage"])
+BARS_FETCHED        = Metrics_Counter("sgsystem_bars_fetched_total", "Bars fetched from MT5", ["timeframe"])
+SIGNALS_EMITTED     = Metrics_Counter("sgsystem_signals_total", "PhaseA signals emitted by label", ["timeframe", "label"])
+LSTM_TRAIN_SECONDS  = Metrics_Histogram("sgsystem_lstm_train_seconds", "LSTM training time")
+LSTM_INFER_SECONDS  = Metrics_Histogram("sgsystem_lstm_inference_seconds", "LSTM inference time")
+LSTM_STREAM_SECONDS = Metrics_Histogram("sgsystem_lstm_stream_seconds", "Stateful LSTM inference time per call (step/resync)", ["mode"])
+CHART_SECONDS       = Metrics_Histogram("sgsystem_chart_render_seconds", "Chart render time", ["chart"])
+EMAIL_IN_FLIGHT     = Metrics_Gauge("sgsystem_email_in_flight", "Emails being sent right now (synchronous send)")
+EMAIL_SENT          = Metrics_Counter("sgsystem_email_sent_total", "Emails sent successfully")
+EMAIL_FAILURES      = Metrics_Counter("sgsystem_email_failures_total", "Email send failures")
+CACHE_REQUESTS      = Metrics_Counter("sgsystem_cache_requests_total", "Cache lookups by result (hit/miss)", ["cache", "result"])
+LAST_RUN_TIMESTAMP  = Metrics_Gauge("sgsystem_last_run_timestamp_seconds", "Unix time when the last run finished")
+
+# ===================================================
+# 処理段の計測（with文）
+# - STAGE_SECONDS に記録し、timings（dict）が渡されればそこにも秒数を入れる
+# ===================================================
+@contextmanager
+def Metrics_StageTimer(stage, timings=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = elapsed
+
+# ===================================================
+# キャッシュのヒット/ミス記録
+# ===================================================
+def Metrics_CacheLookup(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+# ===================================================
+# Prometheus テキスト形式での出力
+# ===================================================
+def Metrics_Render():
+    with _RegistryLock:
+        metrics = list(_Registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = Metrics_Render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# ===================================================
+# メトリクス公開サーバの起動（デーモンスレッド）
+# - port未指定時は環境変数 SGSYSTEM_METRICS_PORT を参照し、未設定なら起動しない
+# ===================================================
+def Metrics_StartServer(port=None, host="127.0.0.1"):
+    if port is None:
+        port = os.getenv("SGSYSTEM_METRICS_PORT")
+        if not port:
+            return None
+
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    print(f"[INFO] メトリクス公開: http://{host}:{port}/metrics")
+    return server
+
+# ===================================================
+# textfile collector 用ファイルへの書き出し（1回実行の終了時に呼ぶ）
+# - path未指定時は環境変数 SGSYSTEM_METRICS_TEXTFILE を参照し、未設定なら何もしない
+# - 書き出し途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+# ===================================================
+def Metrics_WriteTextfile(path=None):
+    if path is None:
+        path = os.getenv("SGSYSTEM_METRICS_TEXTFILE")
+        if not path:
+            return None
+
+    LAST_RUN_TIMESTAMP.set(time.time())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(Metrics_Render())
+    os.replace(tmp_path, path)
+    print(f"[INFO] メトリクス書き出し: {path}")
+    return path
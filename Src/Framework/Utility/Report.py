@@ -0,0 +1,270 @@
+# ===================================================
+# Report.py
+# - 過去シグナルの振り返り用バッチレポート
+# - 銘柄ごとに期間内のローソク足を1回だけ取得（MT5 or リプレイCSV）し、
+#   インジケータ・PhaseAラベル・LSTM予測・PhaseB判定をまとめて計算
+# - シグナル発生足ごとのチャートをプロセスプールで並列描画し、index.html に一覧化
+# - チャートのファイル名は入力内容のハッシュ。既に存在すれば再描画しない
+# ===================================================
+
+import os
+import html
+import pickle
+import hashlib
+import datetime
+import numpy                as np
+import pandas               as pd
+import MetaTrader5          as mt5
+
+from concurrent.futures     import ProcessPoolExecutor
+
+from Framework.MTSystem.MTManager               import MTManager_FetchRatesRange, MTManager_LoadReplay, MTManager_ComputeIndicators, MTManager_PlotChart
+from Framework.ForecastSystem.SignalEngine      import SignalEngine_PhaseB_Evaluate
+
+REPORT_DIR = "Asset/Log/Report"
+
+# 描画内容（スタイル・窓幅）を変えたら更新する（全チャートが再描画される）
+_CHART_VERSION = "report-chart-v2"
+
+# チャートに渡す列（ハッシュ・プロセス間転送の対象）
+_CHART_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "Support", "Resistance", "RSI_14", "MACD", "MACD_signal", "MACD_diff",
+    "Trend_Label", "LSTM_Predicted"
+]
+
+_TIMEFRAME_NAMES = {
+    getattr(mt5, f"TIMEFRAME_{name}"): name for name in ("M1", "M5", "M15", "M30", "H1", "H4", "D1", "W1")
+}
+
+# インジケータの助走本数（SMA_50・MACD・ADXが安定するまで）
+_INDICATOR_WARMUP = 200
+
+# ---------------------------------------------------
+# 日時指定をdfのインデックスと同じタイムゾーンに揃える（tz無しはインデックスのtzとみなす）
+# ---------------------------------------------------
+def _IndexTime(value, tz):
+    value = pd.Timestamp(value)
+    return value.tz_localize(tz) if value.tzinfo is None else value.tz_convert(tz)
+
+# ---------------------------------------------------
+# DataFrameの内容ハッシュ
+# ---------------------------------------------------
+def _FrameHash(df, *extra):
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    for value in extra:
+        h.update(str(value).encode("utf-8"))
+    return h.hexdigest()
+
+# ===================================================
+# 期間内の全足に対するLSTM予測（学習は1回、推論は逐次）
+# - 開始日時より前の足だけで学習し（先読みなし）、学習済み一式は学習データの
+#   ハッシュでキャッシュする → 終了日を延ばして再実行しても過去の予測は変わらない
+# - 期間内は LSTMStreamer で1本ずつ状態を進めて予測（行i = バーi確定後の5本先予測）
+# ===================================================
+def Report_Forecasts(df, first, timeFrame, cache_dir, resync_every = None):
+    from keras.models                           import load_model
+    from Framework.ForecastSystem.LSTMModel     import LSTMModel_Train, LSTMModel_SequenceParams, FEATURES, LSTM_MODEL_VERSION
+    from Framework.ForecastSystem.LSTMStream    import LSTMStreamer, LSTMStream_Supported
+
+    sequence_length, prediction_steps = LSTMModel_SequenceParams(timeFrame)
+    forecasts = np.full((len(df), prediction_steps), np.nan)
+
+    train_df = df.iloc[:first]
+    if len(train_df[FEATURES].dropna()) <= sequence_length + prediction_steps:
+        print("[WARN] 学習用の足が不足 → LSTM予測なし")
+        return forecasts
+
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _FrameHash(train_df[FEATURES], LSTM_MODEL_VERSION, timeFrame)[:16]
+    model_path = os.path.join(cache_dir, f"lstm_{key}.keras")
+    scaler_path = os.path.join(cache_dir, f"lstm_{key}_scalers.pkl")
+
+    if os.path.exists(model_path) and os.path.exists(scaler_path):
+        print(f"[INFO] 学習済みLSTMを再利用: {model_path}")
+        model = load_model(model_path)
+        with open(scaler_path, "rb") as f:
+            feature_scaler, target_scaler = pickle.load(f)
+    else:
+        bundle = LSTMModel_Train(train_df.copy(), timeFrame)
+        model, feature_scaler, target_scaler = bundle["model"], bundle["feature_scaler"], bundle["target_scaler"]
+        model.save(model_path)
+        with open(scaler_path, "wb") as f:
+            pickle.dump((feature_scaler, target_scaler), f)
+
+    raw = df[FEATURES].to_numpy(dtype=np.float64)
+
+    # 逐次推論できないバックエンドでは、期間内の全ウィンドウをまとめて推論する
+    if not LSTMStream_Supported():
+        print("[WARN] 逐次推論非対応のKerasバックエンド → 全ウィンドウ一括推論で代替")
+        scaled = feature_scaler.transform(raw[first - sequence_length + 1:])
+        windows = np.lib.stride_tricks.sliding_window_view(scaled, sequence_length, axis=0).transpose(0, 2, 1)
+        pred_scaled = model.predict(windows, verbose=0)
+        forecasts[first:] = target_scaler.inverse_transform(pred_scaled.reshape(-1, 1)).reshape(pred_scaled.shape)
+        return forecasts
+
+    streamer = LSTMStreamer(model, [(feature_scaler, target_scaler)], sequence_length, resync_every)
+    forecasts[first] = streamer.resync(raw[first - sequence_length + 1:first + 1][np.newaxis])[0]
+    for i in range(first + 1, len(df)):
+        forecasts[i] = streamer.step(raw[i][np.newaxis])[0]
+    return forecasts
+
+# ===================================================
+# 1銘柄分のシグナル抽出
+# - PhaseBが新たに成立した足（予測なしの場合はPhaseAラベルの切り替わり）をシグナルとする
+# - 戻り値: (インジケータ付きdf, 予測配列, シグナル行位置のリスト)
+# ===================================================
+def Report_Signals(df, start, timeFrame, cache_dir, use_forecast = True):
+    df, _ = MTManager_ComputeIndicators(df, timeFrame)
+
+    first = int(df.index.searchsorted(_IndexTime(start, df.index.tz)))
+    if first >= len(df):
+        return df, None, []
+
+    forecasts = Report_Forecasts(df, first, timeFrame, cache_dir) if use_forecast else None
+
+    if forecasts is not None:
+        phase_b = SignalEngine_PhaseB_Evaluate(df, forecasts)
+        df["PhaseB"] = np.select([phase_b == 1, phase_b == -1], ["BUY", "SELL"], "NO-TRADE")
+        active = phase_b != 0
+        changed = np.r_[True, phase_b[1:] != phase_b[:-1]]
+    else:
+        labels = df["Trend_Label"].to_numpy()
+        active = np.isin(labels, ["uptrend", "downtrend"])
+        changed = np.r_[True, labels[1:] != labels[:-1]]
+
+    positions = np.flatnonzero(active & changed)
+    return df, forecasts, [int(p) for p in positions if p >= first]
+
+# ---------------------------------------------------
+# 1シグナル分の描画ジョブ（子プロセスで実行）
+# ---------------------------------------------------
+def _RenderJob(job):
+    import matplotlib
+    matplotlib.use("Agg")
+
+    sub_df, title, path = job
+    if os.path.exists(path):
+        return path, False
+    tmp_path = path + ".tmp.png"
+    MTManager_PlotChart(sub_df, title, tmp_path)
+    os.replace(tmp_path, path)
+    return path, True
+
+def _SignalWindow(df, forecasts, pos, before, after):
+    sub_df = df.iloc[max(0, pos - before):pos + after + 1].copy()
+    sub_df["LSTM_Predicted"] = np.nan
+    if forecasts is not None:
+        # シグナル足の終値から予測5本を実際の後続足の位置に重ねる（実績と見比べられる）
+        offset = pos - max(0, pos - before)
+        steps = min(forecasts.shape[1], len(sub_df) - offset - 1)
+        column = sub_df.columns.get_loc("LSTM_Predicted")
+        sub_df.iloc[offset, column] = sub_df["close"].iloc[offset]
+        sub_df.iloc[offset + 1:offset + 1 + steps, column] = forecasts[pos, :steps]
+    return sub_df[_CHART_COLUMNS]
+
+# ===================================================
+# index.html の書き出し
+# ===================================================
+def _WriteIndex(rows, output_dir, title):
+    def cell(value):
+        return f"<td>{html.escape(str(value))}</td>"
+
+    lines = [
+        "<!DOCTYPE html>",
+        "<html lang=\"ja\"><head><meta charset=\"utf-8\">",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;vertical-align:top}"
+        ".BUY,.uptrend{color:green}.SELL,.downtrend{color:red}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>生成: {datetime.datetime.now().isoformat(timespec='seconds')} / シグナル数: {len(rows)}</p>",
+        "<table><tr><th>時刻</th><th>通貨ペア</th><th>時間足</th><th>PhaseA</th><th>PhaseB</th>"
+        "<th>終値</th><th>LSTM予測（5本先まで）</th><th>チャート</th></tr>",
+    ]
+    for row in rows:
+        chart = html.escape(os.path.basename(row["chart"]))
+        lines.append(
+            "<tr>" + cell(row["time"]) + cell(row["symbol"]) + cell(row["timeframe"])
+            + f"<td class=\"{html.escape(row['phase_a'])}\">{html.escape(row['phase_a'])}</td>"
+            + f"<td class=\"{html.escape(row['phase_b'])}\">{html.escape(row['phase_b'])}</td>"
+            + cell(f"{row['close']:.3f}") + cell(row["forecast"])
+            + f"<td><a href=\"charts/{chart}\"><img src=\"charts/{chart}\" width=\"320\" loading=\"lazy\"></a></td></tr>"
+        )
+    lines += ["</table>", "</body></html>"]
+
+    path = os.path.join(output_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return path
+
+# ===================================================
+# バッチレポート生成
+# - symbols の各銘柄について start〜end のシグナルを抽出し、チャートを並列描画
+# - replay_dir 指定時は {replay_dir}/{symbol}.csv を読み込む（MT5接続不要）
+# - 戻り値: index.html のパス
+# ===================================================
+def Report_Generate(symbols, start, end, timeFrame = mt5.TIMEFRAME_M15, output_dir = REPORT_DIR,
+                    replay_dir = None, use_forecast = True, workers = None,
+                    train_bars = 3000, before = 120, after = 24):
+    tf_name = _TIMEFRAME_NAMES.get(timeFrame, str(timeFrame))
+    chart_dir = os.path.join(output_dir, "charts")
+    cache_dir = os.path.join(output_dir, "cache")
+    os.makedirs(chart_dir, exist_ok=True)
+
+    jobs, rows = [], []
+    for symbolName in symbols:
+        print(f"[INFO] レポート対象: {symbolName} {tf_name} {start}〜{end}")
+        warmup = _INDICATOR_WARMUP + (train_bars if use_forecast else 0)
+
+        if replay_dir:
+            df = MTManager_LoadReplay(os.path.join(replay_dir, f"{symbolName}.csv"), timeFrame)
+            first = df.index.searchsorted(_IndexTime(start, df.index.tz))
+            last = df.index.searchsorted(_IndexTime(end, df.index.tz), side="right")
+            df = df.iloc[max(0, first - warmup):last].copy()
+        else:
+            df = MTManager_FetchRatesRange(start, end, timeFrame, warmup, symbolName)
+        if df is None or len(df) == 0:
+            print(f"[WARN] {symbolName}: データなし → スキップ")
+            continue
+
+        df, forecasts, positions = Report_Signals(df, start, timeFrame, os.path.join(cache_dir, symbolName), use_forecast)
+        print(f"[INFO] {symbolName}: シグナル {len(positions)}件")
+
+        for pos in positions:
+            sub_df = _SignalWindow(df, forecasts, pos, before, after)
+            stamp = df.index[pos]
+            phase_a = str(df["Trend_Label"].iloc[pos])
+            phase_b = str(df["PhaseB"].iloc[pos]) if "PhaseB" in df.columns else "-"
+            title = f"{symbolName} {tf_name} {stamp:%Y-%m-%d %H:%M} {phase_a} / PhaseB {phase_b}"
+            digest = _FrameHash(sub_df, title, _CHART_VERSION)[:16]
+            path = os.path.join(chart_dir, f"{symbolName}_{tf_name}_{stamp:%Y%m%d_%H%M}_{digest}.png")
+
+            if not os.path.exists(path):
+                jobs.append((sub_df, title, path))
+            rows.append({
+                "time"      : f"{stamp:%Y-%m-%d %H:%M}",
+                "symbol"    : symbolName,
+                "timeframe" : tf_name,
+                "phase_a"   : phase_a,
+                "phase_b"   : phase_b,
+                "close"     : float(df["close"].iloc[pos]),
+                "forecast"  : ", ".join(f"{p:.3f}" for p in forecasts[pos]) if forecasts is not None else "-",
+                "chart"     : path,
+            })
+
+    # ===================================================
+    # 変更のあったチャートのみ並列描画
+    # ===================================================
+    print(f"[INFO] チャート描画: {len(jobs)}件（既存 {len(rows) - len(jobs)}件は再利用）")
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, (path, _) in enumerate(pool.map(_RenderJob, jobs, chunksize=max(1, len(jobs) // 64)), 1):
+                if done % 100 == 0 or done == len(jobs):
+                    print(f"[INFO] 描画 {done}/{len(jobs)}", flush=True)
+
+    rows.sort(key=lambda row: (row["time"], row["symbol"]))
+    index_path = _WriteIndex(rows, output_dir, f"SGSystem シグナルレポート {tf_name} {start}〜{end}")
+    print(f"[INFO] レポート出力: {index_path}")
+    return index_path
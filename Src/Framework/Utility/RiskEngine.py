@@ -0,0 +1,160 @@
+# ===================================================
+# RiskEngine.py
+# - TradingPolicy.yaml の risk_management をコード上で検証するモジュール
+# - 取引リターン（バックテスト結果 or LSTM予測残差）をリサンプリングし、
+#   資産曲線をモンテカルロで大量生成（NumPyでベクトル化）
+# - ドローダウン・破産確率・方針内に収まるレバレッジを算出
+# ===================================================
+
+import re
+import numpy as np
+
+from Framework.Utility.MemoryCore   import MemoryCore_Load
+
+POLICY_FILE = "TradingPolicy.yaml"
+
+# ---------------------------------------------------
+# YAMLから読めなかった場合の既定値（TradingPolicy Ver.1.6 準拠）
+# ---------------------------------------------------
+DEFAULT_POLICY = {
+    "max_loss_per_trade"    : 0.02,     # 1回の取引の最大許容損失（口座資産比）
+    "leverage_base"         : 2.0,      # 通常時の上限レバレッジ
+    "leverage_short"        : 5.0,      # 短期トレード時の上限レバレッジ
+}
+
+# 方針ハッシュ -> パース済みパラメータ
+_PolicyCache = {}
+
+# ===================================================
+# リスク管理パラメータの読み込み
+# - risk_management は自然文なので数値部分を正規表現で抜き出す
+#   max_drawdown    : 「…2%以内…」           → 0.02
+#   leverage_policy : 「基本は1〜2倍以内。…最大5倍…」 → 2.0 / 5.0
+# ===================================================
+def RiskEngine_LoadPolicy(filename=POLICY_FILE):
+    policy, digest = MemoryCore_Load(filename)
+    if digest in _PolicyCache:
+        return _PolicyCache[digest]
+
+    params = dict(DEFAULT_POLICY)
+    risk = policy.get("risk_management") or {}
+
+    match = re.search(r"(\d+(?:\.\d+)?)\s*[%％]", str(risk.get("max_drawdown", "")))
+    if match:
+        params["max_loss_per_trade"] = float(match.group(1)) / 100.0
+
+    leverage_text = str(risk.get("leverage_policy", ""))
+    match = re.search(r"(\d+(?:\.\d+)?)\s*[〜~～-]\s*(\d+(?:\.\d+)?)\s*倍", leverage_text)
+    if match:
+        params["leverage_base"] = float(match.group(2))
+    match = re.search(r"最大\s*(\d+(?:\.\d+)?)\s*倍", leverage_text)
+    if match:
+        params["leverage_short"] = float(match.group(1))
+
+    _PolicyCache[digest] = params
+    return params
+
+# ===================================================
+# バックテスト結果 → 1取引あたりのリターン
+# - run_backtest の entry_logs（BUY/SELL行の profit / entry_price）を使用
+# ===================================================
+def RiskEngine_ReturnsFromBacktest(entry_logs):
+    returns = [
+        log["profit"] / log["entry_price"]
+        for log in entry_logs
+        if log.get("type") in ("BUY", "SELL") and log.get("entry_price")
+    ]
+    return np.asarray(returns, dtype=np.float64)
+
+# ===================================================
+# LSTMホールドアウトの実績リターン → 1取引あたりのリターン
+# - realized_returns : 基準足の終値からの実績リターン（LSTMModel が
+#                      df.attrs["LSTM_HoldoutReturns"] に保存、学習に使っていない期間）
+# - direction        : 買い=1 / 売り=-1
+# - 今回の予測リターンは全取引に一律で足さない（1回分の予測が全パスを楽観化するため）。
+#   必要なら RiskEngine_Evaluate の expected_return に別途渡して結果に併記する
+# ===================================================
+def RiskEngine_ReturnsFromHoldout(realized_returns, direction=1):
+    realized_returns = np.asarray(realized_returns, dtype=np.float64).ravel()
+    return direction * realized_returns
+
+# ===================================================
+# モンテカルロ・シミュレーション
+# - 取引リターンを復元抽出し、n_paths本 × n_trades回の資産曲線を生成
+# - メモリを抑えるため chunk 本ずつ処理する
+# - 戻り値: 各パスの最大ドローダウン、最終資産（初期=1.0）、破産フラグ
+# ===================================================
+def RiskEngine_Simulate(trade_returns, leverage, n_paths=100_000, n_trades=50, ruin_level=0.5, seed=None, chunk=25_000):
+    returns = np.asarray(trade_returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) == 0:
+        raise ValueError("取引リターンが空です")
+
+    rng = np.random.default_rng(seed)
+    max_drawdown = np.empty(n_paths)
+    final_equity = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+
+    for start in range(0, n_paths, chunk):
+        stop = min(start + chunk, n_paths)
+        samples = returns[rng.integers(0, len(returns), size=(stop - start, n_trades))]
+
+        # 1取引で資産が100%以上減る場合は0で打ち止め
+        growth = np.maximum(1.0 + leverage * samples, 0.0)
+        equity = np.cumprod(growth, axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+
+        max_drawdown[start:stop] = (1.0 - equity / peak).max(axis=1)
+        final_equity[start:stop] = equity[:, -1]
+        ruined[start:stop] = equity.min(axis=1) <= ruin_level
+
+    return max_drawdown, final_equity, ruined
+
+# ===================================================
+# リスク評価（シグナル通知前のインラインチェック用）
+# - 1取引の損失が confidence 分位で max_loss_per_trade に収まるレバレッジを求め、
+#   方針の上限（通常/短期）でクリップしたものを推奨値とする
+# - 推奨レバレッジ（leverage指定時はその値）で資産曲線をシミュレーション
+# - expected_return（今回の予測リターン）は結果に併記するのみで、シミュレーションには使わない
+# ===================================================
+def RiskEngine_Evaluate(trade_returns, short_term=False, leverage=None, n_paths=100_000, n_trades=50,
+                        confidence=0.99, ruin_level=0.5, seed=0, expected_return=None, verbose=True):
+    policy = RiskEngine_LoadPolicy()
+
+    returns = np.asarray(trade_returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) == 0:
+        raise ValueError("取引リターンが空です")
+
+    cap = policy["leverage_short"] if short_term else policy["leverage_base"]
+    tail_loss = max(-np.quantile(returns, 1.0 - confidence), 0.0)
+    loss_limited = policy["max_loss_per_trade"] / tail_loss if tail_loss > 0 else cap
+    recommended = float(min(loss_limited, cap))
+
+    used = recommended if leverage is None else float(leverage)
+    max_drawdown, final_equity, ruined = RiskEngine_Simulate(
+        returns, used, n_paths=n_paths, n_trades=n_trades, ruin_level=ruin_level, seed=seed
+    )
+
+    result = {
+        "leverage_cap"          : cap,
+        "recommended_leverage"  : recommended,
+        "leverage"              : used,
+        "within_policy"         : used <= recommended + 1e-12,
+        "tail_loss"             : float(tail_loss * used),
+        "breach_probability"    : float(np.mean(-returns * used > policy["max_loss_per_trade"])),
+        "max_drawdown_median"   : float(np.median(max_drawdown)),
+        "max_drawdown_p95"      : float(np.quantile(max_drawdown, 0.95)),
+        "risk_of_ruin"          : float(ruined.mean()),
+        "final_equity_median"   : float(np.median(final_equity)),
+        "expected_return"       : None if expected_return is None else float(expected_return),
+    }
+
+    if verbose:
+        print("[INFO] リスク評価: "
+              f"推奨レバレッジ={recommended:.2f}倍（上限{cap:.0f}倍） "
+              f"最大DD中央値={result['max_drawdown_median']:.2%} "
+              f"最大DD95%={result['max_drawdown_p95']:.2%} "
+              f"破産確率={result['risk_of_ruin']:.2%}")
+
+    return result
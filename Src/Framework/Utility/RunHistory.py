@@ -0,0 +1,218 @@
+# ===================================================
+# RunHistory.py
+# - main.py 1回分の実行結果（入力インジケータ・シグナル・LSTM予測・処理時間・
+#   モデルバージョン）をSQLiteに追記保存する
+# - 後から確定した終値を過去の予測に紐付け（outcomesテーブルに追記）、
+#   モデルを再実行せずにホライズン別の予測誤差を集計できるようにする
+# ===================================================
+
+import os
+import json
+import sqlite3
+import datetime
+import threading
+import numpy    as np
+import pandas   as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at     TEXT    NOT NULL,
+    symbol          TEXT    NOT NULL,
+    timeframe       INTEGER NOT NULL,
+    base_time       INTEGER NOT NULL,
+    trend_signal    TEXT,
+    model_version   TEXT,
+    indicators      TEXT,
+    timings         TEXT,
+    extra           TEXT
+);
+CREATE TABLE IF NOT EXISTS forecasts (
+    forecast_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id          INTEGER NOT NULL REFERENCES runs(run_id),
+    symbol          TEXT    NOT NULL,
+    timeframe       INTEGER NOT NULL,
+    base_time       INTEGER NOT NULL,
+    horizon         INTEGER NOT NULL,
+    predicted       REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outcomes (
+    forecast_id     INTEGER PRIMARY KEY REFERENCES forecasts(forecast_id),
+    realized_time   INTEGER NOT NULL,
+    realized_close  REAL    NOT NULL,
+    recorded_at     TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_symbol_time      ON runs(symbol, timeframe, base_time);
+CREATE INDEX IF NOT EXISTS idx_forecasts_horizon     ON forecasts(symbol, timeframe, horizon, base_time);
+CREATE INDEX IF NOT EXISTS idx_forecasts_run         ON forecasts(run_id);
+"""
+
+# ---------------------------------------------------
+# 保存するインジケータ列（確定足 t-1 の値）
+# ---------------------------------------------------
+INDICATOR_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "RSI_14", "MACD", "MACD_signal", "MACD_diff", "SMA_20", "SMA_50",
+    "ATR_14", "ADX_14", "+DI", "-DI", "PSAR", "Support", "Resistance", "Trend_Label"
+]
+
+# ---------------------------------------------------
+# DatetimeIndex / Timestamp → UNIX秒
+# ---------------------------------------------------
+def _EpochSeconds(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+def _JsonValue(value):
+    # NumPyスカラー（bool_ / str_ / datetime64 等を含む）はPythonの値に変換
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def _JsonDefault(value):
+    # json.dumps が扱えない値のみ呼ばれる → 変換後もJSON型でなければ文字列化
+    if isinstance(value, np.generic):
+        value = _JsonValue(value)
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+    return str(value)
+
+class RunHistoryStore:
+    """
+    実行履歴ストア（SQLite・追記のみ）
+    - runs      : 実行ごとの入力・ラベル・処理時間・モデルバージョン
+    - forecasts : ホライズン別の予測値（horizon=1 が確定足の次の足）
+    - outcomes  : 確定した実績終値（予測に後から紐付け）
+    """
+    def __init__(self, db_path="Asset/Log/RunHistory.db"):
+        self.db_path = db_path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # SQLite接続はスレッドをまたげないため、スレッドごとに保持
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def record_run(self, symbol, timeframe, confirmed_df, trend_signal, predicted_prices,
+                   model_version=None, timings=None, extra=None):
+        """
+        1回分の実行結果を追記
+        - confirmed_df の最終行（確定足）を基準時刻・入力値として保存
+        """
+        row = confirmed_df.iloc[-1]
+        base_time = int(_EpochSeconds([confirmed_df.index[-1]])[0])
+        indicators = {
+            column: _JsonValue(row[column]) for column in INDICATOR_COLUMNS if column in confirmed_df.columns
+        }
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (recorded_at, symbol, timeframe, base_time, trend_signal, model_version, indicators, timings, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, symbol, int(timeframe), base_time, trend_signal, model_version,
+                 json.dumps(indicators, ensure_ascii=False),
+                 json.dumps(timings or {}),
+                 json.dumps(extra or {}, ensure_ascii=False, default=_JsonDefault))
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO forecasts (run_id, symbol, timeframe, base_time, horizon, predicted) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, symbol, int(timeframe), base_time, h + 1, float(p)) for h, p in enumerate(predicted_prices)]
+            )
+        print(f"[INFO] 実行履歴を保存: run_id={run_id}")
+        return run_id
+
+    def join_realized(self, symbol, timeframe, closes):
+        """
+        確定済みの終値（closes: DatetimeIndex付きSeries、形成中の足は含めない）を
+        未確定の予測に紐付ける。基準足からhorizon本先の足の終値を実績とする。
+        """
+        conn = self._connect()
+        pending = conn.execute(
+            "SELECT f.forecast_id, f.base_time, f.horizon FROM forecasts f "
+            "LEFT JOIN outcomes o ON o.forecast_id = f.forecast_id "
+            "WHERE f.symbol = ? AND f.timeframe = ? AND o.forecast_id IS NULL",
+            (symbol, int(timeframe))
+        ).fetchall()
+        if not pending or len(closes) == 0:
+            return 0
+
+        pending = np.asarray(pending, dtype=np.int64)
+        times = _EpochSeconds(closes.index)
+        values = closes.to_numpy(dtype=np.float64)
+
+        # 基準足の位置を二分探索し、horizon本先が確定していれば紐付け
+        pos = np.searchsorted(times, pending[:, 1])
+        found = (pos < len(times)) & (times[np.minimum(pos, len(times) - 1)] == pending[:, 1])
+        target = pos + pending[:, 2]
+        ready = found & (target < len(times))
+        if not ready.any():
+            return 0
+
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        rows = [
+            (int(fid), int(times[t]), float(values[t]), now)
+            for fid, t in zip(pending[ready, 0], target[ready])
+        ]
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO outcomes (forecast_id, realized_time, realized_close, recorded_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        print(f"[INFO] 実績終値を紐付け: {len(rows)}件")
+        return len(rows)
+
+    def start_realized_join(self, symbol, timeframe, fetch_closes, interval_sec=60):
+        """
+        実績紐付けのバックグラウンドジョブ
+        - fetch_closes() は確定済み終値のSeriesを返す関数
+        - 戻り値の Event を set() すると停止
+        """
+        stop = threading.Event()
+
+        def worker():
+            while not stop.wait(interval_sec):
+                try:
+                    self.join_realized(symbol, timeframe, fetch_closes())
+                except Exception as e:
+                    print("[ERROR] 実績紐付け失敗:", e)
+
+        threading.Thread(target=worker, name="RunHistoryJoin", daemon=True).start()
+        return stop
+
+    def forecast_errors(self, symbol, timeframe, horizon=None, window=20):
+        """
+        ホライズン別の予測誤差と、その移動平均（MAE）を返す
+        """
+        query = (
+            "SELECT f.base_time, f.horizon, f.predicted, o.realized_close FROM forecasts f "
+            "JOIN outcomes o ON o.forecast_id = f.forecast_id "
+            "WHERE f.symbol = ? AND f.timeframe = ?"
+        )
+        params = [symbol, int(timeframe)]
+        if horizon is not None:
+            query += " AND f.horizon = ?"
+            params.append(int(horizon))
+        query += " ORDER BY f.horizon, f.base_time"
+
+        df = pd.read_sql_query(query, self._connect(), params=params)
+        df["base_time"] = pd.to_datetime(df["base_time"], unit="s", utc=True).dt.tz_convert("Asia/Tokyo")
+        df["error"] = df["realized_close"] - df["predicted"]
+        df["abs_error"] = df["error"].abs()
+        df["rolling_mae"] = df.groupby("horizon")["abs_error"].transform(
+            lambda s: s.rolling(window, min_periods=1).mean()
+        )
+        return df
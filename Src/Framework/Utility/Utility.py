@@ -5,6 +5,8 @@ from email.mime.text      import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image     import MIMEImage
 
+from Framework.Utility.Metrics import EMAIL_IN_FLIGHT, EMAIL_SENT, EMAIL_FAILURES
+
 class AlertManager:
   def __init__(self, log_path="alerts.log"):
     self.log_path = log_path
@@ -31,6 +33,12 @@ class AlertManager:
     elif predicted_close >= resistance:
       self.log_alert(f"🔺 予測終値がレジスタンスライン({resistance})を上回る予測: {predicted_close:.2f}")
 
+  def check_risk_alert(self, risk: dict, max_ruin: float = 0.01, min_leverage: float = 1.0):
+    if risk["recommended_leverage"] < min_leverage:
+      self.log_alert(f"⚠ 1倍でも1回の許容損失を超える恐れ（推奨レバレッジ {risk['recommended_leverage']:.2f}倍）")
+    if risk["risk_of_ruin"] > max_ruin:
+      self.log_alert(f"⚠ 破産確率が{risk['risk_of_ruin']:.2%}と高水準です。")
+
 class NotificationManager:
   loginID   = ""
   loginPass = ""
@@ -62,14 +70,19 @@ class NotificationManager:
           img = MIMEImage(file_data, name=os.path.basename(file_path))
           msg.attach(img)
 
+    EMAIL_IN_FLIGHT.inc()
     try:
       server = smtplib.SMTP("smtp.gmail.com", 587)
       server.starttls()
       server.login(self.loginID, self.loginPass)
       server.send_message(msg)
       server.quit()
+      EMAIL_SENT.inc()
       print("[INFO] メール送信成功")
     except Exception as e:
+      EMAIL_FAILURES.inc()
       print("[ERROR] メール送信失敗:")
       print(e)
-      print(type(e))
\ No newline at end of file
+      print(type(e))
+    finally:
+      EMAIL_IN_FLIGHT.dec()
\ No newline at end of file
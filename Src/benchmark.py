@@ -0,0 +1,49 @@
+from Framework.Utility.Benchmark            import Benchmark_Run , Benchmark_Save , Benchmark_Load , Benchmark_Compare , DEFAULT_SIZES
+
+import MetaTrader5  as mt5
+import argparse
+import sys
+
+# ===================================================
+# SGSystem ベンチマーク
+# - 実行:  python Src/benchmark.py run [--sizes 1000 10000] [--stages indicators phase_a] [--output path]
+# - 比較:  python Src/benchmark.py compare baseline.json current.json [--threshold 0.1]
+#          （劣化があれば終了コード1）
+# ===================================================
+def main():
+    parser = argparse.ArgumentParser(description="SGSystem benchmark (synthetic OHLCV, no MT5 login)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="ベンチマークを実行してJSONに保存")
+    run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run.add_argument("--stages", nargs="+", default=None, help="前方一致で対象段を絞り込み")
+    run.add_argument("--timeframe", default="M15", help="M1/M5/M15/M30/H1/H4/D1/W1")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--lstm-max-bars", type=int, default=10_000)
+    run.add_argument("--no-memory", action="store_true", help="ピークメモリ計測を省略")
+    run.add_argument("--output", default=None)
+    run.add_argument("--baseline", default=None, help="指定時は実行後にこのベースラインと比較")
+    run.add_argument("--threshold", type=float, default=0.10)
+
+    compare = sub.add_parser("compare", help="2つの結果JSONを比較")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        timeFrame = getattr(mt5, f"TIMEFRAME_{args.timeframe.upper()}")
+        report = Benchmark_Run(args.sizes, timeFrame, args.seed, args.repeat, args.stages,
+                               args.lstm_max_bars, not args.no_memory)
+        Benchmark_Save(report, args.output)
+        if args.baseline:
+            regressions = Benchmark_Compare(Benchmark_Load(args.baseline), report, args.threshold)
+            sys.exit(1 if regressions else 0)
+    else:
+        regressions = Benchmark_Compare(Benchmark_Load(args.baseline), Benchmark_Load(args.current), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
-from Framework.MTSystem.MTManager           import MTManager_Initialize , MTManager_UpdateIndicators , MTManager_DrawChart
-from Framework.ForecastSystem.LSTMModel     import LSTMModel_PredictLSTM
+from Framework.MTSystem.MTManager           import MTManager_Initialize , MTManager_UpdateIndicators , MTManager_UpdateConfluence , MTManager_DrawChart , symbol
+from Framework.ForecastSystem.LSTMModel     import LSTMModel_PredictLSTM , LSTM_MODEL_VERSION
+from Framework.ForecastSystem.SignalEngine  import SignalEngine_PhaseB_Trigger
+from Framework.MTSystem.DataQuality         import TIMEFRAME_SECONDS
 
 from Framework.Utility.Utility              import NotificationManager
 from Framework.Utility.Utility              import AlertManager
+from Framework.Utility.RiskEngine           import RiskEngine_Evaluate , RiskEngine_ReturnsFromHoldout
+from Framework.Utility.RunHistory           import RunHistoryStore
+from Framework.Utility.Metrics              import Metrics_StartServer , Metrics_StageTimer , Metrics_WriteTextfile
 
 import MetaTrader5  as mt5
 import pandas       as pd
@@ -13,10 +18,24 @@ def main():
     _timeFrame      = mt5.TIMEFRAME_M15
     _enableActual   = False
     _enableTrade    = True
+
+    # 複数時間足コンフルエンス（TradingPolicy.yaml の判断時間足：D1/W1）
+    # - 有効時は全時間足が一致した時のみシグナル採用
+    # - チャート/LSTM/PhaseBは最も細かいコンフルエンス時間足で行う（取得1回・キャッシュから再利用）
+    _enableConfluence   = False
+    _confluenceFrames   = [mt5.TIMEFRAME_D1, mt5.TIMEFRAME_W1]
+    if _enableConfluence:
+        _timeFrame = min(_confluenceFrames, key=lambda tf: TIMEFRAME_SECONDS[tf])
     print("==========SGSystem Start==========")
 
+    # メトリクス公開（環境変数 SGSYSTEM_METRICS_PORT 設定時のみ。常駐運用向け）
+    # 1回実行の計測値は終了時に SGSYSTEM_METRICS_TEXTFILE へ書き出す
+    Metrics_StartServer()
+
     notifier    = NotificationManager()
     alerter     = AlertManager()
+    history     = RunHistoryStore()
+    timings     = {}
 
     if not MTManager_Initialize():
         print("[ERROR] MT5初期化に失敗しました。終了します。")
@@ -32,7 +51,12 @@ def main():
         # ===================================================
         if _enableTrade:
             # インジケータ取得（ついでにトレンド情報も取得）
-            df, trend_signal = MTManager_UpdateIndicators(_timeFrame)
+            with Metrics_StageTimer("indicators", timings):
+                if _enableConfluence:
+                    _, trend_signal = MTManager_UpdateConfluence(_confluenceFrames)
+                    df, _ = MTManager_UpdateIndicators(_timeFrame, use_cache=True)
+                else:
+                    df, trend_signal = MTManager_UpdateIndicators(_timeFrame)
             
             # シグナル発生：買い候補/売り候補としてLSTMへ
             if (trend_signal == "uptrend") or (trend_signal == "downtrend"):
@@ -48,7 +72,22 @@ def main():
                 df = df.iloc[:-1]
 
                 # --- Step 3: LSTM予測
-                predicted_prices, df = LSTMModel_PredictLSTM(df, _timeFrame, False)
+                with Metrics_StageTimer("lstm", timings):
+                    predicted_prices, df = LSTMModel_PredictLSTM(df, _timeFrame, False)
+
+                # --- Step 3.5: リスク評価（ホールドアウト期間の実績リターンをリサンプリングしてTradingPolicyの範囲内か確認）
+                direction = -1 if trend_signal == "downtrend" else 1
+                expected_return = direction * (predicted_prices[-1] - df["close"].iloc[-1]) / df["close"].iloc[-1]
+                trade_returns = RiskEngine_ReturnsFromHoldout(df.attrs["LSTM_HoldoutReturns"][:, -1], direction)
+                with Metrics_StageTimer("risk", timings):
+                    risk = RiskEngine_Evaluate(trade_returns, short_term=(_timeFrame != mt5.TIMEFRAME_D1), expected_return=expected_return)
+
+                # --- Step 3.6: PhaseB判定（予測の傾き・サポレジ距離・RSIのルール評価）
+                phaseB_signal, phaseB_reason = SignalEngine_PhaseB_Trigger(df, predicted_prices)
+                print(f"[INFO] PhaseB判定 = {phaseB_signal}（{phaseB_reason}）")
+
+                # --- 実行履歴用に確定足までのdfを保持（Step 4以降でdfは拡張される）
+                df_confirmed = df.copy()
 
                 # --- Step 4: 形成中ローソク足を復元（次の日付で）
                 forming_date = df.index[-1] + pd.Timedelta(days=1)
@@ -67,7 +106,8 @@ def main():
                 # ===================================================
                 # ③チャート描画（トレンドラベル含む）
                 # ===================================================
-                MTManager_DrawChart(df, _timeFrame)
+                with Metrics_StageTimer("chart", timings):
+                    MTManager_DrawChart(df, _timeFrame)
 
                 # ===================================================
                 # ④通知処理
@@ -78,16 +118,35 @@ def main():
 
                 alerter.check_rsi_alert(latest_rsi)
                 alerter.check_prediction_alert(predicted_prices[0], support, resistance)
+                alerter.check_risk_alert(risk)
 
                 subject = f"【SGSystem予測】{df.index[-2].date()}時点"
                 body = f""" ■ トレンドシグナル：{trend_signal}
                             ■ LSTM予測終値：[{predicted_prices[0]:.2f}, {predicted_prices[1]:.2f}, {predicted_prices[2]:.2f}, {predicted_prices[3]:.2f}, {predicted_prices[4]:.2f}]
+                            ■ PhaseB判定：{phaseB_signal}（{phaseB_reason}）
                             ■ RSI：{latest_rsi:.2f}
                             ■ サポートライン：{support:.2f}
                             ■ レジスタンスライン：{resistance:.2f}
+                            ■ 推奨レバレッジ：{risk['recommended_leverage']:.2f}倍（上限{risk['leverage_cap']:.0f}倍）
+                            ■ 最大ドローダウン(95%)：{risk['max_drawdown_p95']:.2%}
+                            ■ 破産確率：{risk['risk_of_ruin']:.2%}
                             （チャート画像2枚を添付）"""
                 
-                notifier.send_email(subject, body, attachments=["Asset/Log/ChartImage/chart_full.png", "Asset/Log/ChartImage/chart_zoom.png"])
+                # PhaseB不成立ならエントリー候補にしない（通知しない）
+                if phaseB_signal == "NO-TRADE":
+                    print("[INFO] PhaseB不成立 → 通知スキップ")
+                else:
+                    with Metrics_StageTimer("notify", timings):
+                        notifier.send_email(subject, body, attachments=["Asset/Log/ChartImage/chart_full.png", "Asset/Log/ChartImage/chart_zoom.png"])
+
+                # ===================================================
+                # ⑤実行履歴の保存（入力・予測・処理時間）＋過去予測への実績紐付け
+                # ===================================================
+                history.record_run(symbol, _timeFrame, df_confirmed, trend_signal, predicted_prices,
+                                   model_version=LSTM_MODEL_VERSION, timings=timings,
+                                   extra={"data_quality": df_confirmed.attrs.get("DataQuality"), "risk": risk,
+                                          "phase_b": [phaseB_signal, phaseB_reason]})
+                history.join_realized(symbol, _timeFrame, df_confirmed["close"])
 
             else:
                 print("[INFO] トレンドシグナルなし → LSTMスキップ")
@@ -101,7 +160,12 @@ def main():
             # ===================================================
             # ①PhaseA（トレンド確認）
             # ===================================================
-            df, trend_signal = MTManager_UpdateIndicators(_timeFrame)
+            with Metrics_StageTimer("indicators", timings):
+                if _enableConfluence:
+                    _, trend_signal = MTManager_UpdateConfluence(_confluenceFrames)
+                    df, _ = MTManager_UpdateIndicators(_timeFrame, use_cache=True)
+                else:
+                    df, trend_signal = MTManager_UpdateIndicators(_timeFrame)
             
             # ===================================================
             # ②PhaseB（LSTMモデル実行：翌日の値を予測）
@@ -113,7 +177,22 @@ def main():
             df = df.iloc[:-1]
 
             # --- Step 3: LSTM予測
-            predicted_prices, df = LSTMModel_PredictLSTM(df, _timeFrame, False)
+            with Metrics_StageTimer("lstm", timings):
+                predicted_prices, df = LSTMModel_PredictLSTM(df, _timeFrame, False)
+
+            # --- Step 3.5: リスク評価（ホールドアウト期間の実績リターンをリサンプリングしてTradingPolicyの範囲内か確認）
+            direction = -1 if trend_signal == "downtrend" else 1
+            expected_return = direction * (predicted_prices[-1] - df["close"].iloc[-1]) / df["close"].iloc[-1]
+            trade_returns = RiskEngine_ReturnsFromHoldout(df.attrs["LSTM_HoldoutReturns"][:, -1], direction)
+            with Metrics_StageTimer("risk", timings):
+                risk = RiskEngine_Evaluate(trade_returns, short_term=(_timeFrame != mt5.TIMEFRAME_D1), expected_return=expected_return)
+
+            # --- Step 3.6: PhaseB判定（予測の傾き・サポレジ距離・RSIのルール評価）
+            phaseB_signal, phaseB_reason = SignalEngine_PhaseB_Trigger(df, predicted_prices)
+            print(f"[INFO] PhaseB判定 = {phaseB_signal}（{phaseB_reason}）")
+
+            # --- 実行履歴用に確定足までのdfを保持（Step 4以降でdfは拡張される）
+            df_confirmed = df.copy()
 
             # --- Step 4: 形成中ローソク足を復元（次の日付で）
             forming_date = df.index[-1] + pd.Timedelta(days=1)
@@ -132,7 +211,8 @@ def main():
             # ===================================================
             # ③チャート描画（トレンドラベル含む）
             # ===================================================
-            MTManager_DrawChart(df, _timeFrame)
+            with Metrics_StageTimer("chart", timings):
+                MTManager_DrawChart(df, _timeFrame)
 
 
             # ===================================================
@@ -144,18 +224,36 @@ def main():
 
             alerter.check_rsi_alert(latest_rsi)
             alerter.check_prediction_alert(predicted_prices[0], support, resistance)
+            alerter.check_risk_alert(risk)
 
             subject = f"【SGSystem予測】{df.index[-2].date()}時点"
             body = f""" ■ トレンドシグナル：{trend_signal or 'No Signal'}
                         ■ LSTM予測終値：[{predicted_prices[0]:.2f}, {predicted_prices[1]:.2f}, {predicted_prices[2]:.2f}, {predicted_prices[3]:.2f}, {predicted_prices[4]:.2f}]
+                        ■ PhaseB判定：{phaseB_signal}（{phaseB_reason}）
                         ■ RSI：{latest_rsi:.2f}
                         ■ サポートライン：{support:.2f}
                         ■ レジスタンスライン：{resistance:.2f}
+                        ■ 推奨レバレッジ：{risk['recommended_leverage']:.2f}倍（上限{risk['leverage_cap']:.0f}倍）
+                        ■ 最大ドローダウン(95%)：{risk['max_drawdown_p95']:.2%}
+                        ■ 破産確率：{risk['risk_of_ruin']:.2%}
                         （チャート画像2枚を添付）"""
 
-            notifier.send_email(subject, body, attachments=["Asset/Log/ChartImage/chart_full.png", "Asset/Log/ChartImage/chart_zoom.png"])
+            with Metrics_StageTimer("notify", timings):
+                notifier.send_email(subject, body, attachments=["Asset/Log/ChartImage/chart_full.png", "Asset/Log/ChartImage/chart_zoom.png"])
+
+            # ===================================================
+            # ⑤実行履歴の保存（入力・予測・処理時間）＋過去予測への実績紐付け
+            # ===================================================
+            history.record_run(symbol, _timeFrame, df_confirmed, trend_signal, predicted_prices,
+                               model_version=LSTM_MODEL_VERSION, timings=timings,
+                               extra={"data_quality": df_confirmed.attrs.get("DataQuality"), "risk": risk,
+                                      "phase_b": [phaseB_signal, phaseB_reason]})
+            history.join_realized(symbol, _timeFrame, df_confirmed["close"])
 
     print("==========SGSystem End==========")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        Metrics_WriteTextfile()
@@ -0,0 +1,42 @@
+from Framework.MTSystem.MTManager            import MTManager_Initialize
+from Framework.Utility.Report               import Report_Generate , REPORT_DIR
+
+import MetaTrader5  as mt5
+import argparse
+import sys
+
+# ===================================================
+# SGSystem 過去シグナルレポート
+# - 実行:  python Src/report.py --start 2024-01-01 --end 2025-01-01 [--symbols USDJPY EURJPY] [--timeframe M15]
+# - MT5接続なし:  --replay-dir <dir>（{dir}/{symbol}.csv を読み込む）
+# - 出力:  Asset/Log/Report/index.html（チャートは charts/ 配下、入力が同じなら再描画しない）
+# ===================================================
+def main():
+    parser = argparse.ArgumentParser(description="SGSystem historical signal report")
+    parser.add_argument("--start", required=True, help="開始日時（例: 2024-01-01）")
+    parser.add_argument("--end", required=True, help="終了日時（例: 2025-01-01）")
+    parser.add_argument("--symbols", nargs="+", default=["USDJPY"])
+    parser.add_argument("--timeframe", default="M15", help="M1/M5/M15/M30/H1/H4/D1/W1")
+    parser.add_argument("--replay-dir", default=None, help="リプレイCSVのディレクトリ（指定時はMT5に接続しない）")
+    parser.add_argument("--output", default=REPORT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="描画プロセス数（既定: CPU数）")
+    parser.add_argument("--no-forecast", action="store_true", help="LSTM予測・PhaseBを省略し、PhaseAの切り替わりをシグナルとする")
+    parser.add_argument("--before", type=int, default=120, help="シグナル足より前に表示する本数")
+    parser.add_argument("--after", type=int, default=24, help="シグナル足より後に表示する本数")
+
+    args = parser.parse_args()
+
+    if args.replay_dir is None and not MTManager_Initialize():
+        sys.exit(1)
+
+    timeFrame = getattr(mt5, f"TIMEFRAME_{args.timeframe.upper()}")
+    try:
+        Report_Generate(args.symbols, args.start, args.end, timeFrame, args.output,
+                        replay_dir=args.replay_dir, use_forecast=not args.no_forecast, workers=args.workers,
+                        before=args.before, after=args.after)
+    finally:
+        if args.replay_dir is None:
+            mt5.shutdown()
+
+if __name__ == "__main__":
+    main()